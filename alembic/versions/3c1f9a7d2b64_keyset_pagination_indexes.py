@@ -0,0 +1,30 @@
+"""keyset pagination indexes
+
+Revision ID: 3c1f9a7d2b64
+Revises: 174d927b4d97
+Create Date: 2026-01-12 10:42:07.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3c1f9a7d2b64'
+down_revision = '174d927b4d97'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_user_created_at_id', 'tasks', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_updated_at_id', 'tasks', ['user_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_due_date_id', 'tasks', ['user_id', 'due_date', 'id'], unique=False)
+    op.create_index('ix_tasks_user_priority_id', 'tasks', ['user_id', 'priority', 'id'], unique=False)
+    op.create_index('ix_tasks_user_title_id', 'tasks', ['user_id', 'title', 'id'], unique=False)
+    op.create_index('ix_categories_user_created_at_id', 'categories', ['user_id', 'created_at', 'id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_categories_user_created_at_id', table_name='categories')
+    op.drop_index('ix_tasks_user_title_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_priority_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_due_date_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_updated_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_created_at_id', table_name='tasks')
@@ -0,0 +1,23 @@
+"""task status/due_date index
+
+Revision ID: 5d8c2f1e7a93
+Revises: b7a3e91c4d20
+Create Date: 2026-02-09 14:06:12.381540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '5d8c2f1e7a93'
+down_revision = 'b7a3e91c4d20'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_user_status_due_date_id', 'tasks', ['user_id', 'status', 'due_date', 'id'], unique=False)
+    # every (user_id, ...) composite already serves user_id lookups
+    op.drop_index('ix_tasks_user_id', table_name='tasks')
+
+def downgrade() -> None:
+    op.create_index('ix_tasks_user_id', 'tasks', ['user_id'], unique=False)
+    op.drop_index('ix_tasks_user_status_due_date_id', table_name='tasks')
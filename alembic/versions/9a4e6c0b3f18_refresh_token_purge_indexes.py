@@ -0,0 +1,25 @@
+"""refresh token purge indexes
+
+Revision ID: 9a4e6c0b3f18
+Revises: 5d8c2f1e7a93
+Create Date: 2026-02-16 11:32:50.774203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '9a4e6c0b3f18'
+down_revision = '5d8c2f1e7a93'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'], unique=False)
+    op.create_index(
+        'ix_refresh_tokens_revoked_at', 'refresh_tokens', ['revoked_at'], unique=False,
+        postgresql_where=sa.text('revoked_at IS NOT NULL'),
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_tokens_revoked_at', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
@@ -0,0 +1,24 @@
+"""data version and category updated_at
+
+Revision ID: b7a3e91c4d20
+Revises: 8e2d4b6a1f35
+Create Date: 2026-02-03 09:27:45.660318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b7a3e91c4d20'
+down_revision = '8e2d4b6a1f35'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('data_version', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('categories', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE categories SET updated_at = created_at")
+    op.alter_column('categories', 'updated_at', nullable=False)
+
+def downgrade() -> None:
+    op.drop_column('categories', 'updated_at')
+    op.drop_column('users', 'data_version')
@@ -0,0 +1,25 @@
+"""rate limit buckets
+
+Revision ID: c2f7d9a1e456
+Revises: 9a4e6c0b3f18
+Create Date: 2026-02-23 16:48:09.215836
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c2f7d9a1e456'
+down_revision = '9a4e6c0b3f18'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=200), nullable=False),
+    sa.Column('tat', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    prefixes=['UNLOGGED'],
+    )
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,39 @@
+"""task counters
+
+Revision ID: e4b8a2c6d913
+Revises: c2f7d9a1e456
+Create Date: 2026-03-09 10:12:37.480126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'e4b8a2c6d913'
+down_revision = 'c2f7d9a1e456'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('task_counters',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('category_id', sa.UUID(), nullable=True),
+    sa.Column('status', postgresql.ENUM('todo', 'doing', 'done', name='task_status', create_type=False), nullable=False),
+    sa.Column('priority', postgresql.ENUM('low', 'med', 'high', name='task_priority', create_type=False), nullable=False),
+    sa.Column('count', sa.BigInteger(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    )
+    op.create_index(
+        'uq_task_counters_key', 'task_counters', ['user_id', 'category_id', 'status', 'priority'],
+        unique=True, postgresql_nulls_not_distinct=True,
+    )
+    op.execute(
+        "INSERT INTO task_counters (user_id, category_id, status, priority, count) "
+        "SELECT user_id, category_id, status, priority, count(*) FROM tasks "
+        "GROUP BY user_id, category_id, status, priority"
+    )
+
+def downgrade() -> None:
+    op.drop_index('uq_task_counters_key', table_name='task_counters')
+    op.drop_table('task_counters')
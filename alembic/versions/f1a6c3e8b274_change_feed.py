@@ -0,0 +1,41 @@
+"""change feed: change_seq and tombstones
+
+Revision ID: f1a6c3e8b274
+Revises: e4b8a2c6d913
+Create Date: 2026-03-16 09:41:52.203617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f1a6c3e8b274'
+down_revision = 'e4b8a2c6d913'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # existing rows get change_seq 0: a feed read from the start returns them
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('categories', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('tombstone_horizon', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_tasks_user_change_seq_id', 'tasks', ['user_id', 'change_seq', 'id'], unique=False)
+    op.create_index('ix_categories_user_change_seq_id', 'categories', ['user_id', 'change_seq', 'id'], unique=False)
+    op.create_table('tombstones',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('record_id', sa.UUID(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'change_seq', 'kind', 'record_id', name='pk_tombstones'),
+    )
+    op.create_index('ix_tombstones_deleted_at', 'tombstones', ['deleted_at'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_tombstones_deleted_at', table_name='tombstones')
+    op.drop_table('tombstones')
+    op.drop_index('ix_categories_user_change_seq_id', table_name='categories')
+    op.drop_index('ix_tasks_user_change_seq_id', table_name='tasks')
+    op.drop_column('users', 'tombstone_horizon')
+    op.drop_column('categories', 'change_seq')
+    op.drop_column('tasks', 'change_seq')
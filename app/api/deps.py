@@ -1,34 +1,85 @@
 # pragma: no cover
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
 import uuid
 
-from app.core.db import get_db
+from app.core.db import PIN_COOKIE, get_db, read_router
 from app.core.security import decode_token
+from app.core.auth_cache import Principal, token_cache
+from app.core.config import settings
+from app.core.rate_limit import limiter
+from app.core.request_timing import phase
 from app.models.user import User
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
-async def get_current_user(
+async def get_current_principal(
     creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
     db: AsyncSession = Depends(get_db),
-) -> User:
+) -> Principal:
     if not creds or creds.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
 
-    token = creds.credentials
-    try:
-        payload = decode_token(token)
-        if payload.get("type") != "access":
-            raise ValueError("wrong token type")
-        user_id = uuid.UUID(payload["sub"])
-    except Exception: # pragma: no cover
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    with phase("auth"):
+        token = creds.credentials
+        principal = token_cache.get(token)
+        if principal is not None:
+            return principal
+
+        try:
+            payload = decode_token(token)
+            if payload.get("type") != "access":
+                raise ValueError("wrong token type")
+            user_id = uuid.UUID(payload["sub"])
+        except Exception: # pragma: no cover
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    res = await db.execute(select(User).where(User.id == user_id))
-    user = res.scalar_one_or_none()
+        res = await db.execute(select(User.id).where(User.id == user_id))
+        if res.scalar_one_or_none() is None: # pragma: no cover
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+        principal = Principal(id=user_id)
+        token_cache.put(token, principal, payload["exp"])
+        return principal
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    user = await db.get(User, principal.id)
     if not user: # pragma: no cover
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     return user
+
+# Session for read-only routes: a replica when configured, otherwise (or when
+# every replica is down, or the user wrote moments ago) the primary session.
+async def get_read_db(
+    request: Request,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    if not read_router.engines or read_router.pinned_to_primary(principal.id, request.cookies.get(PIN_COOKIE)):
+        yield db
+        return
+    for index in read_router.candidates():
+        async with read_router.sessions[index]() as session:
+            try:
+                await session.connection()
+            except (OSError, DBAPIError):
+                read_router.mark_down(index)
+                continue
+            yield session
+            return
+    yield db
+
+# The task/category API shares one per-user budget (settings.rate_limit_api);
+# each route spends its own cost, an int or a function of the request.
+def api_rate_limit(cost=1):
+    return Depends(limiter.limit(settings.rate_limit_api, scope="api", cost=cost))
+
+# full-text search is the expensive list query
+def search_cost(request: Request) -> int:
+    return 5 if request.query_params.get("q") else 1
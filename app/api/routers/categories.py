@@ -1,56 +1,122 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response, Header
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
 import uuid
 
 from app.core.db import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
-from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryOut, PageOut
-from app.services import category_service
+from app.core.request_timing import TimedRoute
+from app.core.serialization import parse_fields, page_json, item_json, json_response
+from app.api.deps import get_current_principal, get_read_db, api_rate_limit
+from app.core.auth_cache import Principal
+from app.core.cache import result_cache
+from app.core.etag import resource_etag, collection_etag, etag_matches, if_match_updated_at, not_modified
+from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryOut, CategoryCountsOut, PageOut
+from app.services import category_service, change_service
+from app.services.task_counter_service import CATEGORY_COUNT_FIELDS
 
-router = APIRouter(prefix="/categories", tags=["categories"])
+router = APIRouter(prefix="/categories", tags=["categories"], route_class=TimedRoute)
 
-@router.post("", response_model=CategoryOut)
+@router.post("", response_model=CategoryOut, dependencies=[api_rate_limit()])
 async def create_category(
     payload: CategoryCreate,
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    return await category_service.create_category(db, user, payload.name)
+    cat = await category_service.create_category(db, user, payload.name)
+    response.headers["ETag"] = resource_etag(cat.updated_at)
+    return cat
 
-@router.get("", response_model=PageOut)
+@router.get("", response_model=PageOut, dependencies=[api_rate_limit()])
 async def list_categories(
+    request: Request,
     q: str | None = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    cursor: str | None = None,
+    total_mode: Literal["exact", "estimate", "none"] = Query("exact", alias="total"),
+    fields: str | None = None,
+    counts: bool = False,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_principal),
 ):
-    items, total = await category_service.list_categories(db, user, q, page, page_size)
-    return {"items": items, "page": page, "page_size": page_size, "total": total}
+    selected = parse_fields(fields, category_service.CATEGORY_OUT_FIELDS)
+    out_fields = selected + CATEGORY_COUNT_FIELDS if counts else selected
+    version = await change_service.current_version(db, user.id)
+    etag = collection_etag(user.id, version, request.query_params.multi_items())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    async def load():
+        items, total, has_more, next_cursor = await category_service.list_categories(
+            db, user, q, page, page_size, cursor, total_mode, selected, counts
+        )
+        return page_json(
+            items, out_fields, page=page, page_size=page_size,
+            total=total, total_mode=total_mode, has_more=has_more, next_cursor=next_cursor,
+        )
 
-@router.get("/{category_id}", response_model=CategoryOut)
+    params = {"q": q, "page": page, "page_size": page_size, "cursor": cursor, "total": total_mode, "fields": selected, "counts": counts}
+    # the version ties the entry to its ETag across workers (see tasks.list_tasks)
+    params["version"] = version
+    # cached as the encoded body, so hits skip serialization entirely
+    body = await result_cache.get_or_load(user.id, "categories:list", params, load)
+    return json_response(body, {"ETag": etag})
+
+@router.get("/{category_id}", response_model=CategoryCountsOut | CategoryOut, dependencies=[api_rate_limit()])
 async def get_category(
     category_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    fields: str | None = None,
+    counts: bool = False,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_principal),
 ):
-    return await category_service.get_category(db, user, category_id)
+    selected = parse_fields(fields, category_service.CATEGORY_OUT_FIELDS)
+    out_fields = selected + CATEGORY_COUNT_FIELDS if counts else selected
+
+    # keyed by version, like the lists, so a write through any worker
+    # retires the entry
+    version = await change_service.current_version(db, user.id)
+
+    # the ETag is cached alongside the body, which may not include updated_at
+    async def load():
+        row = await category_service.get_category_row(db, user, category_id, selected, counts)
+        if counts:
+            # the counts move with task writes that leave the category's
+            # updated_at alone, so tag the body by data_version instead; weak,
+            # as it can't be sent back as an If-Match precondition
+            etag = "W/" + collection_etag(user.id, version, [("category", str(category_id)), ("counts", "1")])
+        else:
+            etag = resource_etag(row.updated_at)
+        return etag, item_json(row, out_fields)
+
+    params = {"id": category_id, "fields": selected, "counts": counts, "version": version}
+    etag, body = await result_cache.get_or_load(user.id, "categories:get", params, load)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return json_response(body, {"ETag": etag})
 
-@router.patch("/{category_id}", response_model=CategoryOut)
+@router.patch("/{category_id}", response_model=CategoryOut, dependencies=[api_rate_limit()])
 async def update_category(
     category_id: uuid.UUID,
     payload: CategoryUpdate,
+    response: Response,
+    if_match: str | None = Header(None),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    return await category_service.update_category(db, user, category_id, payload.name)
+    cat = await category_service.update_category(db, user, category_id, payload.name, if_match_updated_at(if_match))
+    response.headers["ETag"] = resource_etag(cat.updated_at)
+    return cat
 
-@router.delete("/{category_id}")
+@router.delete("/{category_id}", dependencies=[api_rate_limit()])
 async def delete_category(
     category_id: uuid.UUID,
+    if_match: str | None = Header(None),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    await category_service.delete_category(db, user, category_id)
+    await category_service.delete_category(db, user, category_id, if_match_updated_at(if_match))
     return {"ok": True}
@@ -1,27 +1,50 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
+import asyncio
+import csv
+import io
 import uuid
-from datetime import date
+from datetime import date, datetime, timezone
 
+from app.core import events
+from app.core.config import settings
 from app.core.db import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.core.request_timing import TimedRoute
+from app.core.serialization import dumps, parse_fields, page_json, item_json, json_response
+from app.api.deps import get_current_principal, get_read_db, api_rate_limit, search_cost
+from app.core.auth_cache import Principal
+from app.core.cache import result_cache
+from app.core.etag import resource_etag, collection_etag, etag_matches, if_match_updated_at, not_modified
 from app.models.task import TaskStatus, TaskPriority
-from app.schemas.task import TaskCreate, TaskUpdate, TaskOut, PageOut
-from app.services import task_service
+from app.schemas.task import TaskCreate, TaskUpdate, TaskOut, PageOut, TaskBatchIn, TaskBatchOut, TaskStatsOut, ChangesOut
+from app.services import task_service, import_service, change_service, task_counter_service, change_feed_service
 
-router = APIRouter(prefix="/tasks", tags=["tasks"])
+router = APIRouter(prefix="/tasks", tags=["tasks"], route_class=TimedRoute)
 
-@router.post("", response_model=TaskOut)
+@router.post("", response_model=TaskOut, dependencies=[api_rate_limit()])
 async def create_task(
     payload: TaskCreate,
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    return await task_service.create_task(db, user, payload)
+    task = await task_service.create_task(db, user, payload)
+    response.headers["ETag"] = resource_etag(task.updated_at)
+    return task
 
-@router.get("", response_model=PageOut)
+@router.post("/batch", response_model=TaskBatchOut, dependencies=[api_rate_limit(10)])
+async def batch_tasks(
+    payload: TaskBatchIn,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_principal),
+):
+    return await task_service.batch_tasks(db, user, payload.ops, payload.atomic)
+
+@router.get("", response_model=PageOut, dependencies=[api_rate_limit(search_cost)])
 async def list_tasks(
+    request: Request,
     q: str | None = None,
     status: TaskStatus | None = None,
     priority: TaskPriority | None = None,
@@ -33,38 +56,217 @@ async def list_tasks(
     sort: str = Query("-created_at"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    total_mode: Literal["exact", "estimate", "none"] = Query("exact", alias="total"),
+    fields: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_principal),
+):
+    selected = parse_fields(fields, task_service.TASK_OUT_FIELDS)
+    version = await change_service.current_version(db, user.id)
+    etag = collection_etag(user.id, version, request.query_params.multi_items())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    async def load():
+        items, total, has_more, next_cursor = await task_service.list_tasks(
+            db, user, q, status, priority, category_id,
+            due_from, due_to, created_from, created_to,
+            sort, page, page_size, cursor, total_mode, selected
+        )
+        return page_json(
+            items, selected, page=page, page_size=page_size,
+            total=total, total_mode=total_mode, has_more=has_more, next_cursor=next_cursor,
+        )
+
+    params = {
+        "q": q, "status": status, "priority": priority, "category_id": category_id,
+        "due_from": due_from, "due_to": due_to, "created_from": created_from, "created_to": created_to,
+        "sort": sort, "page": page, "page_size": page_size, "cursor": cursor, "total": total_mode,
+        "fields": selected, "version": version,
+    }
+    # Cached as the encoded body, so hits skip serialization entirely. The
+    # version in the key ties the entry to its ETag: the cache generation is
+    # per worker, but data_version is bumped by writes on every worker.
+    body = await result_cache.get_or_load(user.id, "tasks:list", params, load)
+    return json_response(body, {"ETag": etag})
+
+@router.post("/import", dependencies=[api_rate_limit(50)])
+async def import_tasks(
+    request: Request,
+    format: Literal["csv", "ndjson"] = "csv",
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    items, total = await task_service.list_tasks(
+    # raw request body, consumed chunk by chunk; never buffered whole
+    return await import_service.import_tasks(db, user, request.stream(), format)
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+async def _ndjson_chunks(rows):
+    buf = []
+    size = 0
+    async for row in rows:
+        line = TaskOut.model_validate(row).model_dump_json() + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf)
+
+async def _csv_chunks(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(TaskOut.model_fields)
+    async for row in rows:
+        writer.writerow(TaskOut.model_validate(row).model_dump(mode="json").values())
+        if out.tell() >= EXPORT_CHUNK_BYTES:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
+
+@router.get("/export", dependencies=[api_rate_limit(20)])
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    q: str | None = None,
+    status: TaskStatus | None = None,
+    priority: TaskPriority | None = None,
+    category_id: uuid.UUID | None = None,
+    due_from: date | None = None,
+    due_to: date | None = None,
+    created_from: date | None = None,
+    created_to: date | None = None,
+    sort: str = Query("created_at"),
+    db: AsyncSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_principal),
+):
+    rows = task_service.export_tasks(
         db, user, q, status, priority, category_id,
-        due_from, due_to, created_from, created_to,
-        sort, page, page_size
+        due_from, due_to, created_from, created_to, sort
+    )
+    if format == "csv":
+        return StreamingResponse(
+            _csv_chunks(rows), media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="tasks.csv"'},
+        )
+    return StreamingResponse(_ndjson_chunks(rows), media_type="application/x-ndjson")
+
+@router.get("/stats", response_model=TaskStatsOut, dependencies=[api_rate_limit()])
+async def task_stats(
+    today: date | None = None,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_principal),
+):
+    # ?today= lets clients count overdue / this week by their local date
+    today = today or datetime.now(timezone.utc).date()
+    version = await change_service.current_version(db, user.id)
+    etag = collection_etag(user.id, version, [("stats", today.isoformat())])
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    async def load():
+        return dumps(await task_counter_service.task_stats(db, user.id, today))
+
+    # keyed by version, like the lists
+    body = await result_cache.get_or_load(user.id, "tasks:stats", {"today": today, "version": version}, load)
+    return json_response(body, {"ETag": etag})
+
+@router.get("/changes", response_model=ChangesOut, dependencies=[api_rate_limit()])
+async def task_changes(
+    since: str | None = None,
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_principal),
+):
+    # tasks and categories written or deleted after ?since=, for offline clients
+    return json_response(dumps(await change_feed_service.list_changes(db, user, since, limit)))
+
+async def _event_stream(db: AsyncSession, user: Principal):
+    sub = events.broker.subscribe(user.id)
+    try:
+        # subscribed first, so every write after this version gets an event
+        version = await change_service.current_version(db, user.id)
+        # the stream must not hold a pooled connection for its lifetime
+        await db.close()
+        yield b"retry: 5000\n" + events.sse("ready", {"seq": version}, version)
+        while True:
+            try:
+                event, seq = await asyncio.wait_for(sub.get(), settings.events_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # keeps proxies from closing an idle stream
+                yield b": ping\n\n"
+                continue
+            yield events.sse(event, {"seq": seq}, seq)
+    finally:
+        events.broker.unsubscribe(sub)
+
+# Server-sent events: "ready" with the current seq, then "change" after each
+# write and "lagged" when events were dropped; on either, fetch
+# /tasks/changes?since=<last next_since>
+@router.get("/stream", dependencies=[api_rate_limit()])
+async def task_stream(
+    db: AsyncSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_principal),
+):
+    if not settings.events_enabled:
+        raise HTTPException(status_code=404, detail="Live events are disabled")
+    try:
+        await events.broker.start()
+    except events.EventsUnavailable:
+        raise HTTPException(status_code=503, detail="Live events unavailable, poll /tasks/changes", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        _event_stream(db, user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return {"items": items, "page": page, "page_size": page_size, "total": total}
 
-@router.get("/{task_id}", response_model=TaskOut)
+@router.get("/{task_id}", response_model=TaskOut, dependencies=[api_rate_limit()])
 async def get_task(
     task_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    fields: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    user: Principal = Depends(get_current_principal),
 ):
-    return await task_service.get_task(db, user, task_id)
+    selected = parse_fields(fields, task_service.TASK_OUT_FIELDS)
+
+    async def load():
+        row = await task_service.get_task_row(db, user, task_id, selected)
+        return resource_etag(row.updated_at), item_json(row, selected)
+
+    # keyed by version, like the lists, so a write through any worker
+    # retires the entry
+    version = await change_service.current_version(db, user.id)
+    params = {"id": task_id, "fields": selected, "version": version}
+    etag, body = await result_cache.get_or_load(user.id, "tasks:get", params, load)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return json_response(body, {"ETag": etag})
 
-@router.patch("/{task_id}", response_model=TaskOut)
+@router.patch("/{task_id}", response_model=TaskOut, dependencies=[api_rate_limit()])
 async def update_task(
     task_id: uuid.UUID,
     payload: TaskUpdate,
+    response: Response,
+    if_match: str | None = Header(None),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    return await task_service.update_task(db, user, task_id, payload)
+    task = await task_service.update_task(db, user, task_id, payload, if_match_updated_at(if_match))
+    response.headers["ETag"] = resource_etag(task.updated_at)
+    return task
 
-@router.delete("/{task_id}")
+@router.delete("/{task_id}", dependencies=[api_rate_limit()])
 async def delete_task(
     task_id: uuid.UUID,
+    if_match: str | None = Header(None),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    await task_service.delete_task(db, user, task_id)
+    await task_service.delete_task(db, user, task_id, if_match_updated_at(if_match))
     return {"ok": True}
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from sqlalchemy import select
+
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, engine
+from app.models.user import User
+from app.services import import_service, refresh_token_service, task_counter_service, change_feed_service
+
+READ_CHUNK_BYTES = 256 * 1024
+ROOT = Path(__file__).resolve().parent.parent
+
+
+async def _read_file(path: str):
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, READ_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _import_tasks(args) -> int:
+    fmt = args.format or ("ndjson" if args.file.endswith((".ndjson", ".jsonl")) else "csv")
+
+    def progress(summary: dict) -> None:
+        print(
+            f"[import] rows={summary['rows']} imported={summary['imported']} failed={summary['failed']}",
+            file=sys.stderr,
+        )
+
+    async with AsyncSessionLocal() as db:
+        user_id = (await db.execute(select(User.id).where(User.email == args.email))).scalar_one_or_none()
+        if user_id is None:
+            print(f"unknown user: {args.email}", file=sys.stderr)
+            return 1
+        summary = await import_service.import_tasks(
+            db, Principal(id=user_id), _read_file(args.file), fmt, on_progress=progress
+        )
+    print(json.dumps(summary, default=str))
+    return 0
+
+
+async def _purge_refresh_tokens(args) -> int:
+    async with AsyncSessionLocal() as db:
+        summary = await refresh_token_service.purge_refresh_tokens(db, args.batch_size, wait=True)
+    if args.reindex:
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await refresh_token_service.reindex_refresh_tokens(conn)
+    print(json.dumps(summary))
+    return 0
+
+
+async def _partition_refresh_tokens(args) -> int:
+    async with engine.begin() as conn:
+        moved = await refresh_token_service.partition_refresh_tokens(conn)
+    print(json.dumps({"live_tokens_moved": moved}))
+    return 0
+
+
+async def _rebuild_task_counters(args) -> int:
+    async with AsyncSessionLocal() as db:
+        user_id = None
+        if args.email:
+            user_id = (await db.execute(select(User.id).where(User.email == args.email))).scalar_one_or_none()
+            if user_id is None:
+                print(f"unknown user: {args.email}", file=sys.stderr)
+                return 1
+        rows = await task_counter_service.rebuild_task_counters(db, user_id)
+    print(json.dumps({"counter_rows": rows}))
+    return 0
+
+
+async def _purge_tombstones(args) -> int:
+    async with AsyncSessionLocal() as db:
+        summary = await change_feed_service.purge_tombstones(db, args.days)
+    print(json.dumps(summary))
+    return 0
+
+
+def _migrate(args) -> int:
+    from alembic import command
+    from alembic.config import Config
+
+    # alembic/env.py serializes concurrent runs with an advisory lock
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(cfg, "head")
+    return 0
+
+
+def worker_pool(max_connections: int, workers: int) -> tuple[int, int]:
+    # split a total connection budget: two thirds steady pool, the rest overflow
+    per_worker = max(max_connections // workers, 1)
+    size = max(per_worker - per_worker // 3, 1)
+    return size, per_worker - size
+
+
+def _serve(args) -> int:
+    env = dict(os.environ)
+    if args.max_connections:
+        size, overflow = worker_pool(args.max_connections, args.workers)
+        env["DB_POOL_SIZE"], env["DB_MAX_OVERFLOW"] = str(size), str(overflow)
+    print(
+        f"[serve] workers={args.workers} pool_size={env.get('DB_POOL_SIZE', settings.db_pool_size)} "
+        f"max_overflow={env.get('DB_MAX_OVERFLOW', settings.db_max_overflow)}",
+        file=sys.stderr,
+    )
+    if args.migrate:
+        print("[serve] running migrations", file=sys.stderr)
+        _migrate(args)
+
+    # a fresh interpreter, so the workers build their engine from env above
+    argv = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", args.host, "--port", str(args.port), "--workers", str(args.workers),
+        "--proxy-headers", "--no-access-log",
+    ]
+    os.execvpe(sys.executable, argv, env)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import-tasks", help="bulk load tasks for a user from CSV or NDJSON")
+    p.add_argument("--email", required=True, help="owner of the imported tasks")
+    p.add_argument("--format", choices=["csv", "ndjson"], help="defaults from the file extension")
+    p.add_argument("file")
+    p.set_defaults(handler=_import_tasks)
+
+    p = commands.add_parser("purge-refresh-tokens", help="delete expired and revoked refresh tokens in batches")
+    p.add_argument("--batch-size", type=int, help="rows per delete transaction")
+    p.add_argument("--reindex", action="store_true", help="REINDEX CONCURRENTLY afterwards to reclaim index bloat")
+    p.set_defaults(handler=_purge_refresh_tokens)
+
+    p = commands.add_parser(
+        "partition-refresh-tokens",
+        help="one-off: convert refresh_tokens to monthly partitions on expires_at (keeps live tokens only)",
+    )
+    p.set_defaults(handler=_partition_refresh_tokens)
+
+    p = commands.add_parser("rebuild-task-counters", help="recount task_counters from tasks (repairs drift)")
+    p.add_argument("--email", help="only this user (default: everyone)")
+    p.set_defaults(handler=_rebuild_task_counters)
+
+    p = commands.add_parser("purge-tombstones", help="delete change feed tombstones past the retention window")
+    p.add_argument("--days", type=int, help="retention (default: TOMBSTONE_RETENTION_DAYS)")
+    p.set_defaults(handler=_purge_tombstones)
+
+    p = commands.add_parser("migrate", help="alembic upgrade head (safe to run from several replicas at once)")
+    p.set_defaults(handler=_migrate)
+
+    p = commands.add_parser("serve", help="run the API with N uvicorn workers")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    p.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1)))
+    p.add_argument(
+        "--max-connections", type=int, default=int(os.environ.get("DB_MAX_CONNECTIONS", 0)),
+        help="database connections for all workers together; sizes each worker's pool",
+    )
+    p.add_argument(
+        "--migrate", action=argparse.BooleanOptionalAction,
+        default=os.environ.get("RUN_MIGRATIONS", "1") != "0",
+        help="migrate once before starting the workers (use --no-migrate when a release job does it)",
+    )
+    p.set_defaults(handler=_serve)
+
+    args = parser.parse_args(argv)
+    if not asyncio.iscoroutinefunction(args.handler):
+        return args.handler(args)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
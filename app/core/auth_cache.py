@@ -0,0 +1,94 @@
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.user import User
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    # what most handlers need from the caller: enough to scope queries by user_id
+    id: uuid.UUID
+
+
+class TokenCache:
+    # Verified access token -> Principal, LRU-bounded and never outliving the
+    # token's own exp. Process-local: other workers see a deletion within ttl.
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()
+        self._by_user: dict[uuid.UUID, set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Principal | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        principal, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return principal
+
+    def put(self, token: str, principal: Principal, token_exp: float) -> None:
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        remaining = min(self.ttl_seconds, token_exp - time.time())
+        if remaining <= 0:
+            return
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = (principal, time.monotonic() + remaining)
+        self._by_user.setdefault(principal.id, set()).add(token)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: uuid.UUID) -> None:
+        for token in list(self._by_user.get(user_id, ())):
+            self._remove(token)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, token: str) -> None:
+        principal, _ = self._entries.pop(token)
+        tokens = self._by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[principal.id]
+
+
+token_cache = TokenCache(
+    max_entries=settings.auth_cache_max_entries,
+    ttl_seconds=settings.auth_cache_ttl_seconds,
+)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User) -> None:
+    token_cache.invalidate_user(target.id)
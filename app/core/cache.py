@@ -0,0 +1,184 @@
+import abc
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from app.core.config import settings
+
+
+class CacheBackend(abc.ABC):
+    # Storage behind ResultCache. Async so a shared store (Redis, memcached)
+    # can implement it; generations must live in the same store as entries.
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Any | None:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def generation(self, user_id: uuid.UUID) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def bump_generation(self, user_id: uuid.UUID) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def clear(self) -> None:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    # Process-local LRU with per-entry TTL. Entries of an old generation are
+    # never read again and simply age out of the LRU.
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._generations: dict[uuid.UUID, int] = {}
+        self.evictions = 0
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def generation(self, user_id: uuid.UUID) -> int:
+        return self._generations.get(user_id, 0)
+
+    async def bump_generation(self, user_id: uuid.UUID) -> int:
+        gen = self._generations.get(user_id, 0) + 1
+        self._generations[user_id] = gen
+        return gen
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._generations.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_entries": self.max_entries, "evictions": self.evictions}
+
+
+def _params_key(params: dict) -> str:
+    # None and absent are the same filter; values go through str() so enums,
+    # dates and UUIDs normalize the way they arrive on the query string
+    items = sorted((k, str(v)) for k, v in params.items() if v is not None)
+    return hashlib.sha1(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    # Per-user cache of read results. Keys embed the user's generation, which
+    # every task/category write bumps after commit, so a write makes all of
+    # that user's entries unreachable at once. Concurrent misses for the same
+    # key share a single load.
+
+    def __init__(self, backend: CacheBackend | None, ttl_seconds: float = 30):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl_seconds > 0
+
+    async def get_or_load(
+        self,
+        user_id: uuid.UUID,
+        namespace: str,
+        params: dict,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        if not self.enabled:
+            return await loader()
+
+        gen = await self.backend.generation(user_id)
+        key = f"{user_id}:{gen}:{namespace}:{_params_key(params)}"
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        while (pending := self._inflight.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # only the leading request was cancelled: take over the load
+                if not pending.cancelled():
+                    raise
+
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await loader()
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        except BaseException:
+            fut.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+        fut.set_result(value)
+        # a write that landed while loading moved the generation on; don't
+        # store a result that may predate it
+        if await self.backend.generation(user_id) == gen:
+            await self.backend.set(key, value, self.ttl_seconds)
+        return value
+
+    async def invalidate(self, user_id: uuid.UUID) -> None:
+        if self.backend is not None:
+            await self.backend.bump_generation(user_id)
+
+    async def clear(self) -> None:
+        if self.backend is not None:
+            await self.backend.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            **(self.backend.stats() if self.backend is not None else {}),
+        }
+
+
+def _make_backend() -> CacheBackend | None:
+    if settings.result_cache_backend == "memory":
+        return MemoryCacheBackend(max_entries=settings.result_cache_max_entries)
+    if settings.result_cache_backend == "none":
+        return None
+    raise ValueError(f"unknown result cache backend: {settings.result_cache_backend}")
+
+
+result_cache = ResultCache(_make_backend(), ttl_seconds=settings.result_cache_ttl_seconds)
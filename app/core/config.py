@@ -15,8 +15,81 @@ class Settings(BaseSettings):
     refresh_token_expire_days: int = 14
     refresh_token_pepper: str = "CHANGE_ME_PEPPER"
 
+    # refresh token cleanup; interval 0 leaves it to the purge-refresh-tokens CLI
+    refresh_token_purge_interval_seconds: int = 0
+    refresh_token_purge_batch_size: int = 1000
+    # partitioned layout only; must cover refresh_token_expire_days
+    refresh_token_partition_months_ahead: int = 2
+
+    # rate limiting; "memory" is per worker, use "postgres" (or "sqlite" on a
+    # single host) when running several workers
+    rate_limit_backend: str = "memory"  # "memory" | "sqlite" | "postgres"
+    rate_limit_sqlite_path: str = "/tmp/taskmanager-ratelimit.sqlite3"
+    # proxies in front of the app appending to X-Forwarded-For (0 = use the peer address)
+    rate_limit_trusted_proxy_hops: int = 0
+    # shared budget for the authenticated task/category API, spent by per-route cost
+    rate_limit_api: str = "600/minute"
+
+    # password hashing (bcrypt runs off the event loop in a bounded pool)
+    bcrypt_rounds: int = 12
+    password_hasher_executor: str = "thread"  # "thread" | "process"
+    password_hasher_workers: int = 4
+    password_hasher_max_queue: int = 64
+
+    # verified access tokens cached in-process (0 disables)
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_entries: int = 10_000
+
+    # per-user list/get result cache (ttl 0 or backend "none" disables)
+    result_cache_backend: str = "memory"  # "memory" | "none"
+    result_cache_ttl_seconds: int = 30
+    result_cache_max_entries: int = 10_000
+
+    # Prometheus text format on /metrics plus the request timing middleware
+    metrics_enabled: bool = True
+
+    # per-request SQL counting + Server-Timing header; requests over either
+    # budget are logged with their normalized SQL
+    sql_instrumentation: bool = False
+    sql_budget_queries: int = 10
+    sql_budget_ms: float = 250
+
+    # live change events (GET /tasks/stream): writes pg_notify on commit and
+    # each worker LISTENs on one connection of its own; that connection needs
+    # session semantics, so point EVENTS_DATABASE_URL past a transaction pooler
+    events_enabled: bool = True
+    events_database_url: str = ""
+    # per stream; a client further behind than this gets a "lagged" event
+    events_queue_size: int = 100
+    events_ping_seconds: float = 30
+    events_heartbeat_seconds: float = 15
+
+    # change feed deletes older than this are purged by purge-tombstones;
+    # clients whose cursor predates a purge get 410 and resync
+    tombstone_retention_days: int = 90
+
+    task_batch_max_ops: int = 500
+    export_batch_size: int = 1000
+    import_chunk_size: int = 5000
+    import_max_errors: int = 1000
+
     database_url: str
 
+    # connection pool, per worker process (the serve launcher derives these
+    # from a total connection budget when --max-connections is given)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+
+    # optional read replicas (comma-separated URLs) for GET task/category routes
+    read_database_urls: str = ""
+    read_replica_strategy: str = "round_robin"  # "round_robin" | "least_busy"
+    read_your_writes_seconds: float = 5
+    read_replica_retry_seconds: float = 30
+
     @field_validator("database_url", mode="before")
     @classmethod
     def force_asyncpg(cls, v: str) -> str:
@@ -24,6 +97,11 @@ class Settings(BaseSettings):
             return v.replace("postgresql://", "postgresql+asyncpg://", 1)
         return v
 
+    @field_validator("read_database_urls", mode="before")
+    @classmethod
+    def force_asyncpg_replicas(cls, v: str) -> str:
+        return ",".join(cls.force_asyncpg(u.strip()) for u in v.split(",") if u.strip())
+
     @field_validator("cors_origins")
     @classmethod
     def _cors(cls, v: str) -> str:
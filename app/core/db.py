@@ -1,9 +1,77 @@
 # pragma: no cover
+import math
+import time
+from contextvars import ContextVar
+
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-engine = create_async_engine(settings.database_url, echo=False, pool_pre_ping=True)
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # AsyncAdaptedQueuePool that records how long checkouts take, which is
+    # time spent queueing for a free connection (plus connecting, when the
+    # pool has to open a new one).
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def recreate(self):
+        # pool.recreate() (after a disconnect storm) keeps the counters going
+        new = super().recreate()
+        new.checkouts, new.timeouts = self.checkouts, self.timeouts
+        new.wait_seconds, new.max_wait_seconds = self.wait_seconds, self.max_wait_seconds
+        return new
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds,
+            "wait_seconds_max": self.max_wait_seconds,
+        }
+
+def make_engine(url: str):
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            # 0 for both when behind a transaction-pooling pgbouncer
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+        },
+    )
+
+engine = make_engine(settings.database_url)
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 class Base(DeclarativeBase):
@@ -12,3 +80,95 @@ class Base(DeclarativeBase):
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+# Read-your-writes pin: the response to a write sets a short-lived cookie
+# naming the user and when the pin ends, so whichever worker serves the next
+# read keeps it on the primary. ReadYourWritesMiddleware gives each request a
+# slot that mark_write fills and turns it into the Set-Cookie header.
+PIN_COOKIE = "rw_pin"
+_pending_pin: ContextVar[list | None] = ContextVar("read_your_writes_pin", default=None)
+
+class ReadRouter:
+    # Picks a read replica per request: round-robin or the one with the fewest
+    # checked-out connections. A replica that fails to connect is skipped for
+    # read_replica_retry_seconds. Users who just wrote are pinned to the
+    # primary for read_your_writes_seconds (see PIN_COOKIE).
+
+    def __init__(self, urls: list[str], strategy: str = "round_robin", sticky_seconds: float = 5, retry_seconds: float = 30):
+        if strategy not in ("round_robin", "least_busy"):
+            raise ValueError(f"unknown read replica strategy: {strategy}")
+        self.engines = [make_engine(url) for url in urls]
+        self.sessions = [async_sessionmaker(e, class_=AsyncSession, expire_on_commit=False) for e in self.engines]
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._next = 0
+        self._down_until = [0.0] * len(self.engines)
+
+    def mark_write(self, user_id) -> None:
+        pending = _pending_pin.get()
+        if self.engines and self.sticky_seconds > 0 and pending is not None:
+            until = time.time() + self.sticky_seconds
+            pending.append(
+                f"{PIN_COOKIE}={user_id}:{until:.3f}; Max-Age={math.ceil(self.sticky_seconds)}; "
+                "Path=/; HttpOnly; SameSite=Lax"
+            )
+
+    def pinned_to_primary(self, user_id, pin: str | None) -> bool:
+        if not pin:
+            return False
+        pinned_user, _, until = pin.partition(":")
+        try:
+            until = float(until)
+        except ValueError:
+            return False
+        # a pin reaching past sticky_seconds from now wasn't set by us
+        now = time.time()
+        return pinned_user == str(user_id) and now < until <= now + self.sticky_seconds
+
+    def candidates(self) -> list[int]:
+        # replicas in preference order, skipping ones recently seen down
+        now = time.monotonic()
+        up = [i for i in range(len(self.engines)) if self._down_until[i] <= now]
+        if self.strategy == "least_busy":
+            return sorted(up, key=lambda i: self.engines[i].pool.checkedout())
+        start = self._next
+        self._next = (self._next + 1) % max(len(self.engines), 1)
+        return sorted(up, key=lambda i: (i - start) % len(self.engines))
+
+    def mark_down(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + self.retry_seconds
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [{**e.pool.stats(), "up": self._down_until[i] <= now} for i, e in enumerate(self.engines)]
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        pending: list[str] = []
+        token = _pending_pin.set(pending)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and pending:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", pending[-1].encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _pending_pin.reset(token)
+
+read_router = ReadRouter(
+    [u.strip() for u in settings.read_database_urls.split(",") if u.strip()],
+    strategy=settings.read_replica_strategy,
+    sticky_seconds=settings.read_your_writes_seconds,
+    retry_seconds=settings.read_replica_retry_seconds,
+)
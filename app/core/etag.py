@@ -0,0 +1,52 @@
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from fastapi import HTTPException, Response
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+# Strong ETag for a single resource: its updated_at in microseconds, so an
+# If-Match value can be turned back into a WHERE updated_at = ... predicate.
+def resource_etag(updated_at: datetime) -> str:
+    return f'"{(updated_at - EPOCH) // MICROSECOND:x}"'
+
+
+# List pages: the user's data_version plus the normalized query string, so the
+# check costs one primary-key lookup instead of re-running the list query.
+def collection_etag(user_id: uuid.UUID, version: int, params: Iterable[tuple[str, str]]) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(params))
+    digest = hashlib.sha1(f"{user_id}:{version}?{query}".encode("utf-8")).hexdigest()[:20]
+    return f'"c{digest}"'
+
+
+def _tags(header: str) -> list[str]:
+    return [t.strip().removeprefix("W/") for t in header.split(",") if t.strip()]
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # weak comparison, as If-None-Match calls for
+    tags = _tags(if_none_match)
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+# If-Match -> the updated_at the client last saw; None means no precondition.
+def if_match_updated_at(if_match: str | None) -> datetime | None:
+    if not if_match or if_match.strip() == "*":
+        return None
+    # If-Match uses strong comparison, so weak validators never match
+    tags = [t.strip() for t in if_match.split(",") if t.strip() and not t.strip().startswith("W/")]
+    try:
+        micros = int(tags[0].strip('"'), 16)
+    except (IndexError, ValueError):
+        raise HTTPException(status_code=412, detail="Precondition failed")
+    return EPOCH + micros * MICROSECOND
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import uuid
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Live change events for GET /tasks/stream.
+#
+# Every task/category write publishes "<user_id>:<data_version>" on CHANNEL
+# with pg_notify in the same statement as its version bump
+# (change_service.bump_version), so an event goes out on commit and never for
+# a rolled back write. Events only say "something changed up to seq"; clients
+# fetch the rows from GET /tasks/changes.
+#
+# Each worker LISTENs on one dedicated connection, outside the pool, and fans
+# notifications out to its subscribers. Queues are bounded: a subscriber that
+# falls behind has its backlog replaced by a single "lagged" event, as does
+# everyone when the listener reconnects (notifications may have been missed
+# meanwhile). Either way the client catches up through the change feed.
+
+CHANNEL = "task_changes"
+
+
+class EventsUnavailable(Exception):
+    pass
+
+
+def sse(event: str, data: dict, event_id: int | None = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: ".encode("utf-8") + dumps(data) + b"\n\n"
+
+
+class Subscription:
+    def __init__(self, user_id: uuid.UUID, max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[tuple[str, int | None]] = asyncio.Queue(max_queue)
+        self.lagged = False
+
+    def push(self, event: str, seq: int) -> bool:
+        if self.lagged:
+            return False
+        try:
+            self.queue.put_nowait((event, seq))
+            return True
+        except asyncio.QueueFull:
+            self.lag(seq)
+            return False
+
+    def lag(self, seq: int | None) -> None:
+        # the backlog is only "changed up to seq" hints; one event replaces it
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(("lagged", seq))
+        self.lagged = True
+
+    async def get(self) -> tuple[str, int | None]:
+        event, seq = await self.queue.get()
+        if event == "lagged":
+            self.lagged = False
+        return event, seq
+
+
+class EventBroker:
+    def __init__(self, max_queue: int = 100, ping_seconds: float = 30, retry_seconds: float = 1):
+        self.max_queue = max_queue
+        self.ping_seconds = ping_seconds
+        self.retry_seconds = retry_seconds
+        self._subscribers: dict[uuid.UUID, set[Subscription]] = {}
+        self._task: asyncio.Task | None = None
+        self._listening = asyncio.Event()
+        self.received = 0
+        self.delivered = 0
+        self.lagged = 0
+        self.reconnects = 0
+
+    def _dsn(self) -> str:
+        url = make_url(settings.events_database_url or settings.database_url)
+        return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def start(self, timeout: float = 5) -> None:
+        # Starts the listener on first use and waits until LISTEN is active,
+        # so a subscriber can't miss a write committed after it subscribed.
+        if self._task is None or self._task.done():
+            self._listening = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._listening.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise EventsUnavailable("event listener is not connected")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def subscribe(self, user_id: uuid.UUID) -> Subscription:
+        sub = Subscription(user_id, self.max_queue)
+        if not self._listening.is_set():
+            # reconnecting: whatever happens meanwhile won't be notified
+            sub.lag(None)
+        self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subscribers.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.user_id]
+
+    def _on_notify(self, conn, pid, channel, payload: str) -> None:
+        self.received += 1
+        try:
+            user_id, seq = payload.split(":")
+            subs = self._subscribers.get(uuid.UUID(user_id))
+            seq = int(seq)
+        except ValueError:
+            logger.warning("ignoring malformed %s payload %r", CHANNEL, payload)
+            return
+        for sub in subs or ():
+            if sub.push("change", seq):
+                self.delivered += 1
+            else:
+                self.lagged += 1
+
+    def _lag_all(self) -> None:
+        for subs in self._subscribers.values():
+            for sub in subs:
+                if not sub.lagged:
+                    sub.lag(None)
+                    self.lagged += 1
+
+    async def _run(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self._dsn())
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda c: lost.set())
+                await conn.add_listener(CHANNEL, self._on_notify)
+                self._listening.set()
+                # a dead peer is only noticed on use, hence the pings
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self.ping_seconds)
+                    except asyncio.TimeoutError:
+                        await conn.execute("SELECT 1", timeout=self.ping_seconds)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("event listener connection failed: %s", e)
+            finally:
+                self._listening.clear()
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            self.reconnects += 1
+            self._lag_all()
+            await asyncio.sleep(self.retry_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "listening": self._listening.is_set(),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "received": self.received,
+            "delivered": self.delivered,
+            "lagged": self.lagged,
+            "reconnects": self.reconnects,
+        }
+
+
+broker = EventBroker(settings.events_queue_size, settings.events_ping_seconds)
@@ -0,0 +1,256 @@
+import abc
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.auth_cache import token_cache
+from app.core.cache import result_cache
+from app.core.db import engine, read_router
+from app.core.events import broker
+from app.core.password_hasher import password_hasher
+
+# A deliberately small Prometheus text-format registry: everything runs on the
+# event loop thread (engine events included, via greenlets), so updates are
+# plain dict/list operations with no locking, cheap enough to leave on.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+    @abc.abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> list[str]:
+        out = []
+        for labels, (counts, total) in self._series.items():
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = 'le="%s"' % _num(bound)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {running}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {running}")
+        return out
+
+
+class Callback(Metric):
+    # values read at scrape time from stats() dicts that already exist
+    # elsewhere (pool, hasher, caches): fn -> [(label values, value), ...]
+
+    def __init__(self, name, help, type: str, fn: Callable[[], list[tuple[tuple, float]]], labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.type = type
+        self.fn = fn
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in self.fn()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.samples()
+            if samples:
+                lines += metric.header() + samples
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template, method and status.",
+    ("route", "method", "status"),
+))
+http_in_flight = registry.register(Gauge("http_requests_in_flight", "Requests currently being served."))
+db_queries = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time by database and statement kind.",
+    ("db", "kind"), buckets=QUERY_BUCKETS,
+))
+rate_limited = registry.register(Counter("http_rate_limited_total", "Requests rejected with 429.", ("route",)))
+
+
+def route_template(scope) -> str:
+    # the path template keeps label cardinality bounded; unmatched paths share one
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    # plain ASGI middleware: no per-request Request/Response objects
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+        http_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            http_requests.observe(time.perf_counter() - started, route_template(scope), scope["method"], status)
+
+
+def _statement_kind(statement: str) -> str:
+    head = statement.lstrip()[:8].upper()
+    for kind in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+        if head.startswith(kind):
+            return kind.lower()
+    return "other"
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        db_queries.observe(time.perf_counter() - started, name, _statement_kind(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            conn.info["metrics_started"].pop()
+
+
+def stats_metrics(prefix: str, help: str, fn: Callable[[], dict], counters: tuple[str, ...] = ()) -> None:
+    # every numeric key of an existing stats() dict becomes one metric
+    for key, value in fn().items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        registry.register(Callback(
+            f"{prefix}_{key}", f"{help}: {key}.", "counter" if key in counters else "gauge",
+            lambda key=key: [((), fn()[key])],
+        ))
+
+
+def pool_metrics(pools: Callable[[], dict[str, dict]]) -> None:
+    # pools: db label -> TimedQueuePool.stats()
+    for key in ("size", "checked_out", "checked_in", "overflow", "checkouts", "timeouts", "wait_seconds_total"):
+        registry.register(Callback(
+            f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}.",
+            "counter" if key in ("checkouts", "timeouts", "wait_seconds_total") else "gauge",
+            lambda key=key: [((db,), stats[key]) for db, stats in pools().items()],
+            ("db",),
+        ))
+
+
+_installed = False
+
+def install() -> None:
+    # process-wide and idempotent: create_app() runs more than once in tests
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    engines = {"primary": engine, **{f"replica{i}": e for i, e in enumerate(read_router.engines)}}
+    for name, e in engines.items():
+        instrument_engine(e, name)
+    pool_metrics(lambda: {name: e.pool.stats() for name, e in engines.items()})
+
+    stats_metrics("password_hasher", "Password hasher pool", password_hasher.stats,
+                  ("completed", "rejected", "wait_seconds", "run_seconds"))
+    stats_metrics("auth_token_cache", "Access token cache", token_cache.stats, ("hits", "misses", "evictions"))
+    stats_metrics("result_cache", "Read result cache", result_cache.stats, ("hits", "misses", "coalesced", "evictions"))
+    stats_metrics("events", "Live event streams", broker.stats, ("received", "delivered", "lagged", "reconnects"))
@@ -0,0 +1,134 @@
+import base64
+import enum
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_, func, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _load_value(col, raw: Any) -> Any:
+    if raw is None:
+        return None
+    py_type = col.type.python_type
+    if issubclass(py_type, datetime):
+        return datetime.fromisoformat(raw)
+    if issubclass(py_type, date):
+        return date.fromisoformat(raw)
+    return py_type(raw)
+
+
+def encode_cursor(sort: str, value: Any, last_id: uuid.UUID) -> str:
+    payload = {"s": sort, "v": _dump_value(value), "id": str(last_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+# returns (sort value, id) of the last row of the previous page
+def decode_cursor(cursor: str, sort: str, col) -> tuple[Any, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["s"] != sort:
+            raise ValueError("cursor was issued for another sort")
+        return _load_value(col, payload["v"]), uuid.UUID(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_order(col, id_col, desc: bool) -> tuple:
+    if desc:
+        return col.desc(), id_col.desc()
+    return col.asc(), id_col.asc()
+
+
+# Rows strictly after (value, last_id) in keyset_order. Postgres sorts NULLs last
+# ascending and first descending, so nullable columns need the NULL block handled
+# explicitly around the row comparison.
+def keyset_after(col, id_col, value: Any, last_id: uuid.UUID, desc: bool):
+    if value is None:
+        if desc:
+            return or_(and_(col.is_(None), id_col < last_id), col.is_not(None))
+        return and_(col.is_(None), id_col > last_id)
+
+    if desc:
+        return tuple_(col, id_col) < (value, last_id)
+
+    cond = tuple_(col, id_col) > (value, last_id)
+    if col.nullable:
+        cond = or_(cond, col.is_(None))
+    return cond
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+# planner row estimate for count_stmt's filters; no rows are read
+async def estimate_count(db: AsyncSession, count_stmt) -> int:
+    plan = (await db.execute(Explain(count_stmt.with_only_columns(literal_column("1"))))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# Runs the page query (one extra row to detect has_more) and the total in the
+# requested mode: "exact" piggybacks count(*) OVER () on the page query when
+# paging by offset, "estimate" asks the planner, "none" skips it.
+async def fetch_page(
+    db: AsyncSession,
+    stmt,
+    count_stmt,
+    *,
+    offset: int | None,
+    page_size: int,
+    total_mode: str,
+    rows: bool = False,
+):
+    # Entity selects give ORM objects. Column selects (rows=True) give Row
+    # tuples, which in "exact" mode keep the window count as a last column.
+    if offset is not None:
+        stmt = stmt.offset(offset)
+    stmt = stmt.limit(page_size + 1)
+
+    total = None
+    if total_mode == "exact" and offset is not None:
+        result = (await db.execute(stmt.add_columns(func.count().over()))).all()
+        items = result if rows else [row[0] for row in result]
+        if result:
+            total = result[0][-1]
+        elif offset == 0:
+            total = 0
+        else:
+            total = (await db.execute(count_stmt)).scalar_one()
+    else:
+        if total_mode == "exact":
+            total = (await db.execute(count_stmt)).scalar_one()
+        elif total_mode == "estimate":
+            total = await estimate_count(db, count_stmt)
+        result = await db.execute(stmt)
+        items = result.all() if rows else result.scalars().all()
+
+    has_more = len(items) > page_size
+    return items[:page_size], total, has_more
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core import security
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _timed(fn, *args):
+    # time.monotonic is system-wide, so start times compare across processes too
+    return time.monotonic(), fn(*args)
+
+
+class PasswordHasher:
+    # bcrypt is deliberately slow; running it inline would stall the event loop,
+    # so all password work goes through a bounded pool with a queue limit.
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_queue: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"unknown password hasher executor: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        self._pending += 1
+        queued_at = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            started_at, result = await loop.run_in_executor(self._get_executor(), _timed, fn, *args)
+        finally:
+            self._pending -= 1
+
+        self.completed += 1
+        self.wait_seconds += started_at - queued_at
+        self.run_seconds += time.monotonic() - started_at
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.hash_password, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> tuple[bool, str | None]:
+        return await self._run(security.verify_and_update_password, password, password_hash)
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds": self.wait_seconds,
+            "run_seconds": self.run_seconds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    kind=settings.password_hasher_executor,
+    workers=settings.password_hasher_workers,
+    max_queue=settings.password_hasher_max_queue,
+)
@@ -1,5 +1,243 @@
-# pragma: no cover
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import abc
+import asyncio
+import math
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
 
-limiter = Limiter(key_func=get_remote_address)
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.db import engine as default_engine
+from app.core.security import decode_token
+
+# Buckets live in app.models.rate_limit for the Postgres backend.
+#
+# GCRA (a token bucket stored as one number): each key keeps a "theoretical
+# arrival time". A request of cost c pushes it c * period/limit forward and is
+# allowed while it stays within one period of now, so bursts up to `limit` are
+# fine and the budget refills continuously rather than at window edges.
+
+_SPEC = re.compile(r"^\s*(\d+)\s*/\s*(\d+)?\s*(second|minute|hour|day)s?\s*$")
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    limit: int
+    period: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        # "5/minute", "600/hour", "10/30 seconds"
+        m = _SPEC.match(spec)
+        if not m:
+            raise ValueError(f"invalid rate limit: {spec!r}")
+        return cls(int(m.group(1)), int(m.group(2) or 1) * _UNITS[m.group(3)])
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.limit
+
+
+def _gcra(tat: float | None, now: float, rate: RateLimit, cost: int) -> tuple[bool, float]:
+    # -> (allowed, new tat when allowed / retry-after seconds when not)
+    new_tat = max(tat or now, now) + cost * rate.interval
+    if new_tat - now > rate.period:
+        return False, new_tat - now - rate.period
+    return True, new_tat
+
+
+class RateLimitBackend(abc.ABC):
+    # Atomically apply one request of `cost` to `key`; returns (allowed, retry_after).
+
+    @abc.abstractmethod
+    async def hit(self, key: str, rate: RateLimit, cost: int) -> tuple[bool, float]:
+        ...
+
+    def reset(self) -> None:
+        pass
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    # per-process; only correct with a single worker
+
+    def __init__(self):
+        self._tats: dict[str, float] = {}
+
+    async def hit(self, key: str, rate: RateLimit, cost: int) -> tuple[bool, float]:
+        now = time.time()
+        allowed, value = _gcra(self._tats.get(key), now, rate, cost)
+        if not allowed:
+            return False, value
+        self._tats[key] = value
+        if len(self._tats) > 100_000:
+            # fully refilled buckets carry no state
+            self._tats = {k: t for k, t in self._tats.items() if t > now}
+        return True, 0.0
+
+    def reset(self) -> None:
+        self._tats.clear()
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    # Shared by every worker on one host through a local file; BEGIN IMMEDIATE
+    # serializes the read-modify-write across processes.
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limit_buckets (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _hit(self, key: str, rate: RateLimit, cost: int) -> tuple[bool, float]:
+        with self._lock:
+            if self._local is None:
+                self._local = self._connect()
+            conn = self._local
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tat FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+                allowed, value = _gcra(row[0] if row else None, time.time(), rate, cost)
+                if allowed:
+                    conn.execute(
+                        "INSERT INTO rate_limit_buckets (key, tat) VALUES (?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET tat = excluded.tat",
+                        (key, value),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return (True, 0.0) if allowed else (False, value)
+
+    async def hit(self, key: str, rate: RateLimit, cost: int) -> tuple[bool, float]:
+        # off the loop: BEGIN IMMEDIATE may wait on another process's lock
+        return await asyncio.to_thread(self._hit, key, rate, cost)
+
+    def reset(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM rate_limit_buckets")
+
+
+class PostgresRateLimitBackend(RateLimitBackend):
+    # Shared by all workers and hosts. One statement per request: the upsert
+    # only writes when the request fits, using the database clock so hosts
+    # with skewed clocks agree.
+
+    HIT_SQL = text("""
+        WITH c AS (SELECT extract(epoch FROM clock_timestamp())::float8 AS now)
+        INSERT INTO rate_limit_buckets AS b (key, tat)
+        SELECT :key, c.now + :inc FROM c
+        ON CONFLICT (key) DO UPDATE
+            SET tat = greatest(b.tat, excluded.tat - :inc) + :inc
+            WHERE greatest(b.tat, excluded.tat - :inc) + :inc - (excluded.tat - :inc) <= :period
+        RETURNING tat
+    """)
+    RETRY_SQL = text("SELECT tat - extract(epoch FROM clock_timestamp()) FROM rate_limit_buckets WHERE key = :key")
+    PRUNE_SQL = text("DELETE FROM rate_limit_buckets WHERE tat < extract(epoch FROM clock_timestamp())")
+
+    def __init__(self, engine: AsyncEngine | None = None, prune_every: float = 300):
+        self.engine = engine or default_engine
+        self.prune_every = prune_every
+        self._last_prune = time.monotonic()
+
+    async def hit(self, key: str, rate: RateLimit, cost: int) -> tuple[bool, float]:
+        inc = cost * rate.interval
+        if inc > rate.period:
+            return False, inc - rate.period
+        async with self.engine.begin() as conn:
+            res = await conn.execute(self.HIT_SQL, {"key": key, "inc": inc, "period": rate.period})
+            if res.scalar_one_or_none() is not None:
+                allowed, retry_after = True, 0.0
+            else:
+                ahead = (await conn.execute(self.RETRY_SQL, {"key": key})).scalar_one_or_none() or 0.0
+                allowed, retry_after = False, max(ahead + inc - rate.period, 0.0)
+            if time.monotonic() - self._last_prune > self.prune_every:
+                self._last_prune = time.monotonic()
+                await conn.execute(self.PRUNE_SQL)
+        return allowed, retry_after
+
+
+def client_ip(request: Request) -> str:
+    # Behind N trusted proxies the client is the Nth address from the right
+    # of X-Forwarded-For; anything further left is client-controlled.
+    hops = settings.rate_limit_trusted_proxy_hops
+    if hops > 0:
+        forwarded = [a.strip() for a in request.headers.get("x-forwarded-for", "").split(",") if a.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.client.host if request.client else "unknown"
+
+
+def request_identity(request: Request) -> str:
+    # The user id when the request carries a valid access token (signature
+    # and expiry only, no database), otherwise the client address.
+    auth = request.headers.get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = decode_token(token)
+            if payload.get("type") == "access":
+                return f"user:{payload['sub']}"
+        except Exception:
+            pass
+    return f"ip:{client_ip(request)}"
+
+
+class Limiter:
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self.rejected = 0
+
+    def limit(self, spec: str, scope: str, cost: int | Callable[[Request], int] = 1):
+        # Route dependency. Routes sharing a scope draw on one budget, each
+        # spending its own cost (an int, or computed from the request).
+        rate = RateLimit.parse(spec)
+
+        async def dependency(request: Request) -> None:
+            n = cost(request) if callable(cost) else cost
+            if n <= 0:
+                return
+            allowed, retry_after = await self.backend.hit(f"{scope}:{request_identity(request)}", rate, n)
+            if not allowed:
+                self.rejected += 1
+                raise RateLimitExceeded(retry_after)
+
+        return dependency
+
+    def reset(self) -> None:
+        self.backend.reset()
+
+
+def _make_backend() -> RateLimitBackend:
+    if settings.rate_limit_backend == "memory":
+        return MemoryRateLimitBackend()
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteRateLimitBackend(settings.rate_limit_sqlite_path)
+    if settings.rate_limit_backend == "postgres":
+        return PostgresRateLimitBackend()
+    raise ValueError(f"unknown rate limit backend: {settings.rate_limit_backend}")
+
+
+limiter = Limiter(_make_backend())
+
+
+def retry_after_header(exc: RateLimitExceeded) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
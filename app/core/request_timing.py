@@ -0,0 +1,167 @@
+import functools
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.db import engine, read_router
+from app.core.metrics import route_template
+
+logger = logging.getLogger("app.request_timing")
+
+# Opt-in (settings.sql_instrumentation): counts SQL per request and times the
+# auth, db and serialize phases. Each request gets a RequestTiming in a
+# context variable; engine events and the route class below add to it and
+# the middleware turns it into a Server-Timing header and a budget check.
+
+class RequestTiming:
+    __slots__ = ("started", "queries", "db_seconds", "phases", "statements", "endpoint_done")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.phases: dict[str, float] = {}
+        self.statements: list[str] = []
+        self.endpoint_done: float | None = None
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        total = time.perf_counter() - self.started
+        parts = [f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"']
+        parts += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+@contextmanager
+def phase(name: str):
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add_phase(name, time.perf_counter() - started)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\$\d+|%\(\w+\)s")
+_IN_LISTS = re.compile(r"\bIN \((?:\?, )+\?\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+def normalize_sql(statement: str) -> str:
+    # literals and bind markers -> ?, IN lists collapsed, whitespace squeezed,
+    # so the same query shape groups under one line in the slow-request log
+    sql = _LITERALS.sub("?", statement)
+    sql = _IN_LISTS.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("request_timing_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        timing = _current.get()
+        started = conn.info.get("request_timing_started")
+        if timing is None or not started:
+            return
+        timing.queries += 1
+        timing.db_seconds += time.perf_counter() - started.pop()
+        if len(timing.statements) < 200:
+            timing.statements.append(statement)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("request_timing_started"):
+            conn.info["request_timing_started"].pop()
+
+class TimedRoute(APIRoute):
+    # Marks when the endpoint function returns; what the route handler does
+    # after that (response_model validation, JSON encoding) is "serialize".
+
+    def __init__(self, path, endpoint, **kwargs):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kw):
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                timing = _current.get()
+                if timing is not None:
+                    timing.endpoint_done = time.perf_counter()
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timing = _current.get()
+            if timing is not None and timing.endpoint_done is not None:
+                timing.add_phase("serialize", time.perf_counter() - timing.endpoint_done)
+            return response
+
+        return timed_handler
+
+class RequestTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            _check_budget(scope, timing)
+
+def _check_budget(scope, timing: RequestTiming) -> None:
+    elapsed_ms = (time.perf_counter() - timing.started) * 1000
+    if timing.queries <= settings.sql_budget_queries and elapsed_ms <= settings.sql_budget_ms:
+        return
+    shapes = Counter(normalize_sql(s) for s in timing.statements)
+    logger.warning(
+        "request over budget: %s %s took %.1fms with %d queries (%.1fms in db)\n%s",
+        scope["method"], route_template(scope), elapsed_ms, timing.queries, timing.db_seconds * 1000,
+        "\n".join(f"  {n}x {sql}" for sql, n in shapes.most_common()),
+    )
+
+_installed = False
+
+def install() -> None:
+    # process-wide and idempotent, like metrics.install()
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    for e in [engine, *read_router.engines]:
+        instrument_engine(e)
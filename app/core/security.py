@@ -8,7 +8,7 @@ import uuid
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 
 
 def hash_password(password: str) -> str:
@@ -19,6 +19,11 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
+def verify_and_update_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    # second item is a fresh hash when the stored one uses outdated cost settings
+    return pwd_context.verify_and_update(password, password_hash)
+
+
 def create_access_token(subject: str, extra: Optional[Dict[str, Any]] = None) -> str:
     now = datetime.now(timezone.utc)
     exp = now + timedelta(minutes=settings.access_token_expire_min)
@@ -1,15 +1,34 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.rate_limit import limiter
+from app.core import events, metrics, request_timing
+from app.core.db import AsyncSessionLocal, ReadYourWritesMiddleware, engine, get_db, read_router
+from app.core.rate_limit import RateLimitExceeded, retry_after_header
+from app.core.password_hasher import password_hasher, PasswordHasherBusy
 from app.api.routers import all_routers
+from app.services import refresh_token_service
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    purge = None
+    if settings.refresh_token_purge_interval_seconds > 0:
+        purge = asyncio.create_task(
+            refresh_token_service.purge_periodically(AsyncSessionLocal, settings.refresh_token_purge_interval_seconds)
+        )
+    yield
+    if purge is not None:
+        purge.cancel()
+    await events.broker.stop()
+    password_hasher.shutdown()
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
     # CORS
     app.add_middleware(
@@ -20,13 +39,30 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    # Rate limiting
-    app.state.limiter = limiter
-    app.add_middleware(SlowAPIMiddleware)
+    # read-your-writes pin for replica reads (a no-op without replicas)
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    if settings.metrics_enabled:
+        metrics.install()
+        app.add_middleware(metrics.MetricsMiddleware)
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics_endpoint():
+            return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
+    if settings.sql_instrumentation:
+        request_timing.install()
+        app.add_middleware(request_timing.RequestTimingMiddleware)
+
+    # Rate limiting (route dependencies, see app.core.rate_limit)
     @app.exception_handler(RateLimitExceeded)
     async def _rate_limit_handler(request, exc):
-        return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"})
+        metrics.rate_limited.inc(metrics.route_template(request.scope))
+        return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=retry_after_header(exc))
+
+    @app.exception_handler(PasswordHasherBusy)
+    async def _password_hasher_busy_handler(request, exc):
+        return JSONResponse(status_code=503, content={"detail": "Server busy, retry shortly"}, headers={"Retry-After": "1"})
 
     # Routers
     for r in all_routers:
@@ -37,6 +73,16 @@ def create_app() -> FastAPI:
     async def health():
         return {"ok": True, "env": settings.env}
 
+    # readiness: the database answers through this worker's pool
+    @app.get("/ready")
+    async def ready(db: AsyncSession = Depends(get_db)):
+        stats = {"pool": engine.pool.stats(), "replicas": read_router.stats()}
+        try:
+            await db.execute(text("SELECT 1"))
+        except Exception:
+            return JSONResponse(status_code=503, content={"ok": False, **stats})
+        return {"ok": True, **stats}
+
     return app
 
 app = create_app()
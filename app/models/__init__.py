@@ -2,3 +2,6 @@ from app.models.user import User
 from app.models.category import Category
 from app.models.task import Task, TaskStatus, TaskPriority
 from app.models.refresh_token import RefreshToken
+from app.models.rate_limit import rate_limit_buckets
+from app.models.task_counter import task_counters
+from app.models.tombstone import tombstones
@@ -0,0 +1,13 @@
+from sqlalchemy import Table, Column, String, Float
+from app.core.db import Base
+
+# GCRA state for app.core.rate_limit's Postgres backend: one "theoretical
+# arrival time" (epoch seconds) per key. Unlogged: the counters are
+# disposable, so skip WAL; the table comes back empty after a crash.
+rate_limit_buckets = Table(
+    "rate_limit_buckets",
+    Base.metadata,
+    Column("key", String(200), primary_key=True),
+    Column("tat", Float, nullable=False),
+    prefixes=["UNLOGGED"],
+)
@@ -24,3 +24,9 @@ class RefreshToken(Base):
     user = relationship("User", back_populates="refresh_tokens")
 
 Index("ix_refresh_tokens_user_revoked", RefreshToken.user_id, RefreshToken.revoked_at)
+# purge job: expired rows by range, revoked rows via a partial index
+Index("ix_refresh_tokens_expires_at", RefreshToken.expires_at)
+Index(
+    "ix_refresh_tokens_revoked_at", RefreshToken.revoked_at,
+    postgresql_where=RefreshToken.revoked_at.is_not(None),
+)
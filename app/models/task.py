@@ -1,14 +1,21 @@
 import uuid
 from datetime import datetime, timezone, date
 from enum import Enum
-from sqlalchemy import String, Text, DateTime, ForeignKey, Enum as SAEnum, Date, Integer
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, Text, DateTime, ForeignKey, Enum as SAEnum, Date, Integer, BigInteger, Index, Computed
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
 
 def utcnow():
     return datetime.now(timezone.utc)
 
+# 'simple' keeps search language-agnostic (no stemming, no stop words)
+SEARCH_CONFIG = "simple"
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(description, '')), 'B')"
+)
+
 class TaskStatus(str, Enum):
     todo = "todo"
     doing = "doing"
@@ -21,9 +28,23 @@ class TaskPriority(str, Enum):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # keyset pagination: one (user_id, <sort field>, id) index per SORT_FIELDS key;
+        # these also cover plain user_id lookups, so there is no single-column index
+        Index("ix_tasks_user_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_updated_at_id", "user_id", "updated_at", "id"),
+        Index("ix_tasks_user_due_date_id", "user_id", "due_date", "id"),
+        Index("ix_tasks_user_priority_id", "user_id", "priority", "id"),
+        Index("ix_tasks_user_title_id", "user_id", "title", "id"),
+        # status-filtered listings ordered/ranged by due date (todo lists, overdue)
+        Index("ix_tasks_user_status_due_date_id", "user_id", "status", "due_date", "id"),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+        # GET /tasks/changes walks this in (change_seq, id) order
+        Index("ix_tasks_user_change_seq_id", "user_id", "change_seq", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     category_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("categories.id", ondelete="SET NULL"), index=True, nullable=True)
 
     title: Mapped[str] = mapped_column(String(140), nullable=False)
@@ -34,8 +55,14 @@ class Task(Base):
 
     due_date: Mapped[date | None] = mapped_column(Date, nullable=True)
 
+    # maintained by Postgres; deferred so regular loads never fetch it
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True), deferred=True)
+
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False)
 
+    # the owner's data_version as of the last write to this row
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
+
     user = relationship("User", back_populates="tasks")
     category = relationship("Category", back_populates="tasks")
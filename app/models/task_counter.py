@@ -0,0 +1,22 @@
+from sqlalchemy import Table, Column, ForeignKey, BigInteger, Index, Enum as SAEnum
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.db import Base
+from app.models.task import TaskStatus, TaskPriority
+
+# Task counts per (user, category, status, priority), kept current by the task
+# write paths in the same transaction (app.services.task_counter_service).
+# category_id NULL is "uncategorized"; NULLS NOT DISTINCT makes it one row
+# per combination, so it can be an ON CONFLICT target like any other value.
+task_counters = Table(
+    "task_counters",
+    Base.metadata,
+    Column("user_id", UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("category_id", UUID(as_uuid=True), ForeignKey("categories.id", ondelete="CASCADE"), nullable=True),
+    Column("status", SAEnum(TaskStatus, name="task_status"), nullable=False),
+    Column("priority", SAEnum(TaskPriority, name="task_priority"), nullable=False),
+    Column("count", BigInteger, nullable=False, server_default="0"),
+    Index(
+        "uq_task_counters_key", "user_id", "category_id", "status", "priority",
+        unique=True, postgresql_nulls_not_distinct=True,
+    ),
+)
@@ -0,0 +1,19 @@
+from sqlalchemy import Table, Column, ForeignKey, BigInteger, String, DateTime, Index, PrimaryKeyConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.db import Base
+
+# Deleted tasks and categories, so the change feed (GET /tasks/changes) can
+# report deletes of hard-deleted rows. change_seq is the owner's data_version
+# of the deleting write; purge-tombstones drops rows past the retention window.
+tombstones = Table(
+    "tombstones",
+    Base.metadata,
+    Column("user_id", UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("change_seq", BigInteger, nullable=False),
+    Column("kind", String(16), nullable=False),  # "task" | "category"
+    Column("record_id", UUID(as_uuid=True), nullable=False),
+    Column("deleted_at", DateTime(timezone=True), nullable=False),
+    # the change feed's order, so it doubles as the feed's index
+    PrimaryKeyConstraint("user_id", "change_seq", "kind", "record_id", name="pk_tombstones"),
+    Index("ix_tombstones_deleted_at", "deleted_at"),
+)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime
+from sqlalchemy import String, DateTime, BigInteger
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
@@ -17,6 +17,12 @@ class User(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
 
+    # bumped in the same statement as every task/category write; versions the user's collections
+    data_version: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
+    # highest change_seq whose tombstones have been purged; change feed cursors
+    # older than this can no longer see every delete
+    tombstone_horizon: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
+
     categories = relationship("Category", back_populates="user", cascade="all, delete-orphan")
     tasks = relationship("Task", back_populates="user", cascade="all, delete-orphan")
     refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from typing import Literal
 from pydantic import BaseModel, Field, ConfigDict
 
 class CategoryCreate(BaseModel):
@@ -15,10 +16,19 @@ class CategoryOut(BaseModel):
     name: str
     created_at: datetime
 
+class CategoryCountsOut(CategoryOut):
+    # with ?counts=true; open is todo + doing
+    open_task_count: int
+    task_count: int
+
 class PageOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
-    items: list[CategoryOut]
+    items: list[CategoryCountsOut | CategoryOut]
     page: int
     page_size: int
-    total: int
+    # None when total_mode is "none"; a planner estimate when "estimate"
+    total: int | None
+    total_mode: Literal["exact", "estimate", "none"] = "exact"
+    has_more: bool = False
+    next_cursor: str | None = None
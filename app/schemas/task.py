@@ -1,7 +1,10 @@
 import uuid
 from datetime import datetime, date
+from typing import Any, Literal
 from pydantic import BaseModel, Field, ConfigDict
+from app.core.config import settings
 from app.models.task import TaskStatus, TaskPriority
+from app.schemas.category import CategoryOut
 
 class TaskCreate(BaseModel):
     title: str = Field(min_length=1, max_length=140)
@@ -39,5 +42,61 @@ class PageOut(BaseModel):
     items: list[TaskOut]
     page: int
     page_size: int
+    # None when total_mode is "none"; a planner estimate when "estimate"
+    total: int | None
+    total_mode: Literal["exact", "estimate", "none"] = "exact"
+    has_more: bool = False
+    next_cursor: str | None = None
+
+class CategoryStatsOut(BaseModel):
+    category_id: uuid.UUID | None
+    total: int
+    by_status: dict[str, int]
+
+class TaskStatsOut(BaseModel):
     total: int
+    by_status: dict[str, int]
+    by_priority: dict[str, int]
+    # largest first; category_id None is uncategorized
+    by_category: list[CategoryStatsOut]
+    # open (todo/doing) tasks due before today / from today to the end of the week
+    overdue: int
+    due_this_week: int
+
+class ChangeOut(BaseModel):
+    seq: int
+    kind: Literal["task", "category"]
+    id: uuid.UUID
+    deleted: bool
+    # the row as it is now; None for deletes
+    data: TaskOut | CategoryOut | None = None
+
+class ChangesOut(BaseModel):
+    changes: list[ChangeOut]
+    # pass back as ?since= for the next batch (or the next sync)
+    next_since: str
+    has_more: bool
+
+class TaskBatchOp(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: uuid.UUID | None = None
+    # validated per item against TaskCreate / TaskUpdate so one bad item
+    # doesn't reject the whole request
+    data: dict[str, Any] | None = None
+
+class TaskBatchIn(BaseModel):
+    ops: list[TaskBatchOp] = Field(min_length=1, max_length=settings.task_batch_max_ops)
+    # atomic: any failing item aborts the whole batch; otherwise valid items are applied
+    atomic: bool = True
+
+class TaskBatchResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: uuid.UUID | None = None
+    item: TaskOut | None = None
+    error: Any = None
 
+class TaskBatchOut(BaseModel):
+    committed: bool
+    results: list[TaskBatchResult]
@@ -8,10 +8,10 @@ from fastapi import HTTPException, status
 from app.models.user import User
 from app.models.refresh_token import RefreshToken
 from app.core.security import (
-    hash_password, verify_password,
     create_access_token, create_refresh_token,
     decode_token, hash_refresh_token
 )
+from app.core.password_hasher import password_hasher
 from app.core.config import settings
 
 def utcnow():
@@ -22,7 +22,7 @@ async def register(db: AsyncSession, email: str, password: str) -> User:
     if res.scalar_one_or_none():
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    user = User(email=email, password_hash=hash_password(password))
+    user = User(email=email, password_hash=await password_hasher.hash(password))
     db.add(user)
     await db.commit()
     await db.refresh(user)
@@ -31,8 +31,14 @@ async def register(db: AsyncSession, email: str, password: str) -> User:
 async def login(db: AsyncSession, email: str, password: str) -> tuple[str, str]:
     res = await db.execute(select(User).where(User.email == email))
     user = res.scalar_one_or_none()
-    if not user or not verify_password(password, user.password_hash):
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # cost settings changed since this hash was made; saved with the refresh token below
+        user.password_hash = new_hash
 
     access = create_access_token(str(user.id))
     refresh, jti = create_refresh_token(str(user.id))
@@ -1,31 +1,78 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert, update, delete
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 import uuid
+from datetime import datetime, timezone
 
 from app.models.category import Category
-from app.models.user import User
+from app.core.auth_cache import Principal
+from app.schemas.category import CategoryOut
+from app.services.change_service import bump_version, bumped_seq, next_seq, tombstones_cte, writes_committed
+from app.services import task_service
+from app.services.task_counter_service import category_count_columns
+from app.core.pagination import encode_cursor, decode_cursor, keyset_order, keyset_after, fetch_page
+from app.core.serialization import projection
 
-async def create_category(db: AsyncSession, user: User, name: str) -> Category:
-    cat = Category(user_id=user.id, name=name)
-    db.add(cat)
+def utcnow():
+    return datetime.now(timezone.utc)
+
+# reads are column rows in CategoryOut's field order (see task_service)
+CATEGORY_OUT_FIELDS = tuple(CategoryOut.model_fields)
+
+async def create_category(db: AsyncSession, user: Principal, name: str) -> Category:
+    now = utcnow()
+    bump = bump_version(user.id)
     try:
+        res = await db.execute(
+            insert(Category)
+            .values(id=uuid.uuid4(), user_id=user.id, name=name, created_at=now, updated_at=now, change_seq=bumped_seq(bump))
+            .returning(Category)
+            .add_cte(bump)
+        )
+        cat = res.scalar_one()
         await db.commit()
-    except Exception:
+        await writes_committed(user.id)
+    except IntegrityError:
         await db.rollback()
         raise HTTPException(status_code=409, detail="Category name already exists")
-    await db.refresh(cat)
     return cat
 
-async def get_category(db: AsyncSession, user: User, category_id: uuid.UUID) -> Category:
+async def get_category(db: AsyncSession, user: Principal, category_id: uuid.UUID) -> Category:
     res = await db.execute(select(Category).where(Category.id == category_id, Category.user_id == user.id))
     cat = res.scalar_one_or_none()
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
     return cat
 
-async def list_categories(db: AsyncSession, user: User, q: str | None, page: int, page_size: int):
-    stmt = select(Category).where(Category.user_id == user.id)
+def _counts(counts: bool) -> list:
+    return category_count_columns(Category.id, Category.user_id) if counts else []
+
+async def get_category_row(
+    db: AsyncSession, user: Principal, category_id: uuid.UUID, fields=CATEGORY_OUT_FIELDS, counts: bool = False
+):
+    stmt = select(*projection(Category.__table__, fields, "updated_at", computed=_counts(counts))).where(
+        Category.id == category_id, Category.user_id == user.id
+    )
+    row = (await db.execute(stmt)).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return row
+
+async def list_categories(
+    db: AsyncSession,
+    user: Principal,
+    q: str | None,
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+    total_mode: str = "exact",
+    fields=CATEGORY_OUT_FIELDS,
+    counts: bool = False,
+):
+    stmt = select(*projection(Category.__table__, fields, "created_at", "id", computed=_counts(counts))).where(
+        Category.user_id == user.id
+    )
     count_stmt = select(func.count()).select_from(Category).where(Category.user_id == user.id)
 
     if q:
@@ -33,25 +80,88 @@ async def list_categories(db: AsyncSession, user: User, q: str | None, page: int
         stmt = stmt.where(func.lower(Category.name).like(ql))
         count_stmt = count_stmt.where(func.lower(Category.name).like(ql))
 
-    stmt = stmt.order_by(Category.created_at.desc()).offset((page-1)*page_size).limit(page_size)
+    stmt = stmt.order_by(*keyset_order(Category.created_at, Category.id, True))
+    if cursor:
+        value, last_id = decode_cursor(cursor, "-created_at", Category.created_at)
+        stmt = stmt.where(keyset_after(Category.created_at, Category.id, value, last_id, True))
+
+    items, total, has_more = await fetch_page(
+        db, stmt, count_stmt,
+        offset=None if cursor else (page-1)*page_size,
+        page_size=page_size,
+        total_mode=total_mode,
+        rows=True,
+    )
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor("-created_at", items[-1].created_at, items[-1].id)
+    return items, total, has_more, next_cursor
+
+# a write matched no row: either the category is gone or If-Match was stale
+async def _missing_or_stale(db: AsyncSession, user: Principal, category_id: uuid.UUID, expected_updated_at) -> None:
+    if expected_updated_at is not None:
+        await get_category(db, user, category_id)
+        raise HTTPException(status_code=412, detail="Category was modified")
+    raise HTTPException(status_code=404, detail="Category not found")
 
-    total = (await db.execute(count_stmt)).scalar_one()
-    items = (await db.execute(stmt)).scalars().all()
-    return items, total
+async def update_category(
+    db: AsyncSession,
+    user: Principal,
+    category_id: uuid.UUID,
+    name: str | None,
+    expected_updated_at: datetime | None = None,
+) -> Category:
+    if name is None:
+        cat = await get_category(db, user, category_id)
+        if expected_updated_at is not None and cat.updated_at != expected_updated_at:
+            raise HTTPException(status_code=412, detail="Category was modified")
+        return cat
 
-async def update_category(db: AsyncSession, user: User, category_id: uuid.UUID, name: str | None) -> Category:
-    cat = await get_category(db, user, category_id)
-    if name is not None:
-        cat.name = name
+    conds = [Category.id == category_id, Category.user_id == user.id]
+    if expected_updated_at is not None:
+        conds.append(Category.updated_at == expected_updated_at)
+    bump = bump_version(user.id)
     try:
+        res = await db.execute(
+            update(Category)
+            .where(*conds)
+            .values(name=name, updated_at=utcnow(), change_seq=bumped_seq(bump))
+            .returning(Category)
+            .add_cte(bump)
+        )
+        cat = res.scalar_one_or_none()
+        if not cat:
+            await _missing_or_stale(db, user, category_id, expected_updated_at)
         await db.commit()
-    except Exception:
+        await writes_committed(user.id)
+    except IntegrityError:
         await db.rollback()
         raise HTTPException(status_code=409, detail="Category name already exists")
-    await db.refresh(cat)
     return cat
 
-async def delete_category(db: AsyncSession, user: User, category_id: uuid.UUID) -> None:
-    cat = await get_category(db, user, category_id)
-    await db.delete(cat)
+async def delete_category(
+    db: AsyncSession,
+    user: Principal,
+    category_id: uuid.UUID,
+    expected_updated_at: datetime | None = None,
+) -> None:
+    conds = [Category.id == category_id, Category.user_id == user.id]
+    if expected_updated_at is not None:
+        conds.append(Category.updated_at == expected_updated_at)
+    # One seq for the category and the tasks moved out of it. The bump comes
+    # first, as in every task write (change_service.bump_first/lock_version),
+    # so all of them lock the user row before categories and tasks.
+    seq = await next_seq(db, user.id)
+    # locking the category holds off task writes that would move tasks into
+    # it (their foreign key check needs a share lock) while its tasks move out
+    locked = await db.execute(select(Category.id).where(*conds).with_for_update())
+    if locked.scalar_one_or_none() is None:
+        await _missing_or_stale(db, user, category_id, expected_updated_at)
+    await task_service.uncategorize_tasks(db, user, category_id, seq)
+    gone = delete(Category).where(*conds).returning(Category.id).cte("gone")
+    await db.execute(
+        select(func.count()).select_from(gone).add_cte(tombstones_cte(user.id, "category", gone.c.id, seq, utcnow()))
+    )
     await db.commit()
+    await writes_committed(user.id)
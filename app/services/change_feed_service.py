@@ -0,0 +1,156 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, update, func, tuple_, literal
+from fastapi import HTTPException
+from datetime import datetime, timedelta, timezone
+import uuid
+
+from app.models.task import Task
+from app.models.category import Category
+from app.models.user import User
+from app.models.tombstone import tombstones
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.schemas.task import TaskOut
+from app.schemas.category import CategoryOut
+
+# GET /tasks/changes: a user's tasks and categories written after a cursor,
+# plus tombstones for the deleted ones, in (change_seq, kind, id) order.
+# Within one seq, categories come before the tasks that may reference them.
+#
+# The cursor is "<seq>" once everything up to seq has been returned, or
+# "<seq>.<kind>.<id>" when a batch ended inside a seq's rows. A plain
+# data_version works as a starting point. No cursor (or 0) is a full sync:
+# every live row, and only tombstones newer than the version it began at
+# (carried as a fourth part), since the client holds nothing older.
+
+KINDS = {"category": (Category, tuple(CategoryOut.model_fields)), "task": (Task, tuple(TaskOut.model_fields))}
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+def encode_since(seq: int, kind: str | None = None, last_id: uuid.UUID | None = None, floor: int | None = None) -> str:
+    if kind is None:
+        return str(seq)
+    return f"{seq}.{kind}.{last_id}" + (f".{floor}" if floor is not None else "")
+
+# -> (seq, kind, last id, full sync floor); seq -1 is before every row
+def decode_since(since: str | None) -> tuple[int, str | None, uuid.UUID | None, int | None]:
+    if not since or since == "0":
+        return -1, None, None, None
+    try:
+        seq, *rest = since.split(".")
+        if not rest:
+            return int(seq), None, None, None
+        kind, last_id, *floor = rest
+        if kind not in KINDS or len(floor) > 1:
+            raise ValueError(kind)
+        return int(seq), kind, uuid.UUID(last_id), int(floor[0]) if floor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid since")
+
+def _after(seq_col, id_col, kind: str, seq: int, last_kind: str | None, last_id: uuid.UUID | None) -> list:
+    # rows of one kind past the cursor, as a range on (user_id, change_seq, id)
+    if last_kind is None or kind < last_kind:
+        return [seq_col > seq]
+    if kind > last_kind:
+        return [seq_col >= seq]
+    return [tuple_(seq_col, id_col) > tuple_(seq, last_id)]
+
+async def list_changes(db: AsyncSession, user: Principal, since: str | None, limit: int) -> dict:
+    seq, last_kind, last_id, floor = decode_since(since)
+    version, horizon = (await db.execute(
+        select(User.data_version, User.tombstone_horizon).where(User.id == user.id)
+    )).one()
+    full_sync = seq < 0 or floor is not None
+    if seq < 0:
+        floor = version
+    if not full_sync and seq < horizon:
+        # deletes after that point may have been purged: the client must resync
+        raise HTTPException(status_code=410, detail="since is older than the retained change history")
+    if last_kind is None and seq >= version:
+        # nothing newer (the common poll); skips the three range scans
+        return {"changes": [], "next_since": encode_since(seq), "has_more": False}
+
+    # Each source is read up to limit + 1 in feed order, so merging them
+    # gives the first limit + 1 changes overall. The reads are separate
+    # statements, each seeing whatever has committed by then, so they stop at
+    # version: everything up to it committed before it was read (writes hold
+    # the user row until commit, in seq order), and later writes are left
+    # whole to the next batch rather than split across these reads.
+    changes = []
+    for kind, (model, fields) in KINDS.items():
+        cols = [getattr(model, f) for f in fields]
+        res = await db.execute(
+            select(model.change_seq, *cols)
+            .where(
+                model.user_id == user.id,
+                model.change_seq <= version,
+                *_after(model.change_seq, model.id, kind, seq, last_kind, last_id),
+            )
+            .order_by(model.change_seq, model.id)
+            .limit(limit + 1)
+        )
+        for change_seq, *values in res:
+            data = dict(zip(fields, values))
+            changes.append({"seq": change_seq, "kind": kind, "id": data["id"], "deleted": False, "data": data})
+
+    conds = [tombstones.c.user_id == user.id, tombstones.c.change_seq <= version]
+    if last_kind is None:
+        conds.append(tombstones.c.change_seq > seq)
+    else:
+        conds.append(
+            tuple_(tombstones.c.change_seq, tombstones.c.kind, tombstones.c.record_id)
+            > tuple_(seq, literal(last_kind), last_id)
+        )
+    if full_sync:
+        conds.append(tombstones.c.change_seq > floor)
+    res = await db.execute(
+        select(tombstones.c.change_seq, tombstones.c.kind, tombstones.c.record_id)
+        .where(*conds)
+        .order_by(tombstones.c.change_seq, tombstones.c.kind, tombstones.c.record_id)
+        .limit(limit + 1)
+    )
+    changes += [{"seq": s, "kind": kind, "id": id_, "deleted": True, "data": None} for s, kind, id_ in res]
+
+    # uuid text order is Postgres' uuid order
+    changes.sort(key=lambda c: (c["seq"], c["kind"], str(c["id"])))
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        last = changes[-1]
+        next_since = encode_since(last["seq"], last["kind"], last["id"], floor if full_sync else None)
+    else:
+        next_since = encode_since(max(version, seq))
+    return {"changes": changes, "next_since": next_since, "has_more": has_more}
+
+async def purge_tombstones(db: AsyncSession, retention_days: int | None = None) -> dict:
+    # Drops tombstones past the retention window and raises each affected
+    # user's horizon to the highest purged seq, so older cursors get a 410.
+    if retention_days is None:
+        retention_days = settings.tombstone_retention_days
+    cutoff = utcnow() - timedelta(days=retention_days)
+    purged = (
+        delete(tombstones)
+        .where(tombstones.c.deleted_at < cutoff)
+        .returning(tombstones.c.user_id, tombstones.c.change_seq)
+        .cte("purged")
+    )
+    per_user = (
+        select(purged.c.user_id, func.max(purged.c.change_seq).label("seq"))
+        .group_by(purged.c.user_id)
+        .subquery()
+    )
+    horizons = (
+        update(User)
+        .where(User.id == per_user.c.user_id)
+        .values(tombstone_horizon=func.greatest(User.tombstone_horizon, per_user.c.seq))
+        .returning(User.id)
+        .cte("horizons")
+    )
+    res = await db.execute(select(
+        select(func.count()).select_from(purged).scalar_subquery(),
+        select(func.count()).select_from(horizons).scalar_subquery(),
+    ))
+    tombstones_purged, users = res.one()
+    await db.commit()
+    return {"tombstones": tombstones_purged, "users": users}
@@ -0,0 +1,78 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, func, literal, BigInteger, DateTime, ColumnElement
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+
+from app.models.user import User
+from app.models.tombstone import tombstones
+from app.core import events
+from app.core.cache import result_cache
+from app.core.config import settings
+from app.core.db import read_router
+
+# Data-modifying CTE bumping the user's data_version. Attach it to a write with
+# stmt.add_cte(...) so the bump rides in the same statement and transaction.
+# SQLAlchemy mis-binds Python-side column defaults next to a CTE, so such
+# statements must pass id/created_at/updated_at values explicitly.
+# With events enabled it also publishes the new version (app.core.events),
+# which Postgres delivers only if the transaction commits.
+def bump_version(user_id: uuid.UUID):
+    returning = [User.data_version]
+    if settings.events_enabled:
+        payload = func.concat(User.id, ":", User.data_version)
+        returning.append(func.pg_notify(events.CHANNEL, payload).label("notified"))
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+        .returning(*returning)
+        .cte("version_bump")
+    )
+
+# The bumped version as a value in the same statement: rows a write touches
+# take it as their change_seq, which orders them in the change feed. The bump
+# locks the user row until commit, so a user's writes commit in seq order.
+def bumped_seq(bump):
+    return select(bump.c.data_version).scalar_subquery()
+
+# For a write's WHERE clause: Postgres evaluates it once, as a one-time
+# filter before any row is scanned, so the statement bumps (and locks the
+# user row) before it locks the rows it changes. Every write takes the user
+# row first, then categories, then tasks (see delete_category).
+def bump_first(bump):
+    return bumped_seq(bump).is_not(None)
+
+# Locks the user row as the bump does, without bumping, for writes that must
+# lock other rows before they know whether anything will change
+async def lock_version(db: AsyncSession, user_id: uuid.UUID) -> int:
+    res = await db.execute(select(User.data_version).where(User.id == user_id).with_for_update(key_share=True))
+    return res.scalar_one()
+
+# the bump on its own, for writes spread over several statements
+async def next_seq(db: AsyncSession, user_id: uuid.UUID) -> int:
+    return (await db.execute(select(bump_version(user_id).c.data_version))).scalar_one()
+
+# Tombstones for the rows of a deleting CTE; ids is its RETURNING id column
+# and seq an int or bumped_seq(...)
+def tombstones_cte(user_id: uuid.UUID, kind: str, ids, seq, deleted_at: datetime):
+    if not isinstance(seq, ColumnElement):
+        seq = literal(seq, BigInteger)
+    return (
+        insert(tombstones)
+        .from_select(
+            ["user_id", "change_seq", "kind", "record_id", "deleted_at"],
+            select(literal(user_id, UUID(as_uuid=True)), seq, literal(kind), ids, literal(deleted_at, DateTime(timezone=True))),
+        )
+        .cte(f"{kind}_tombstones")
+    )
+
+async def current_version(db: AsyncSession, user_id: uuid.UUID) -> int:
+    res = await db.execute(select(User.data_version).where(User.id == user_id))
+    return res.scalar_one_or_none() or 0
+
+# after every committed task/category write: drop the user's cached reads and
+# keep their next reads on the primary until replicas have caught up
+async def writes_committed(user_id: uuid.UUID) -> None:
+    await result_cache.invalidate(user_id)
+    read_router.mark_write(user_id)
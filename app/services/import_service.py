@@ -0,0 +1,194 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pydantic import ValidationError
+from typing import AsyncIterator, Callable
+import csv
+from collections import Counter
+import json
+import uuid
+from datetime import datetime, timezone
+
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.models.category import Category
+from app.schemas.task import TaskCreate
+from app.services.change_service import next_seq, writes_committed
+from app.services.task_counter_service import apply_deltas, delta_key
+
+COPY_COLUMNS = [
+    "id", "user_id", "category_id", "title", "description",
+    "status", "priority", "due_date", "created_at", "updated_at", "change_seq",
+]
+
+# CSV/NDJSON fields accepted per row; "category" is a category name
+IMPORT_FIELDS = ("title", "description", "status", "priority", "due_date", "category", "category_id")
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+def _decode(lineno: int, raw: bytes) -> tuple[int, str, bool]:
+    try:
+        text, valid = raw.decode("utf-8"), True
+    except UnicodeDecodeError:
+        # kept (with U+FFFD) so CSV quote counting stays in step; the row is reported
+        text, valid = raw.decode("utf-8", "replace"), False
+    if lineno == 1:
+        text = text.removeprefix("\ufeff")
+    return lineno, text.rstrip("\r"), valid
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str, bool]]:
+    # split an arbitrary byte stream into (line number, text, valid utf-8)
+    # without buffering it all
+    buf = b""
+    lineno = 0
+    async for chunk in chunks:
+        buf += chunk
+        *complete, buf = buf.split(b"\n")
+        for raw in complete:
+            lineno += 1
+            yield _decode(lineno, raw)
+    if buf:
+        yield _decode(lineno + 1, buf)
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict]]:
+    header = None
+    pending: list[str] = []
+    start = 0
+    invalid = False
+    async for lineno, line, valid in _lines(chunks):
+        if not pending:
+            start, invalid = lineno, False
+        pending.append(line)
+        invalid = invalid or not valid
+        # quotes are doubled inside fields, so an odd count means a quoted newline
+        if sum(p.count('"') for p in pending) % 2:
+            continue
+        values = next(csv.reader(["\n".join(pending)]), [])
+        pending = []
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if invalid:
+            yield start, {"__error__": "Invalid UTF-8"}
+            continue
+        if not any(values):
+            continue
+        yield start, dict(zip(header, values))
+    if pending:
+        yield start, {"__error__": "Unterminated quoted field"}
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict]]:
+    async for lineno, line, valid in _lines(chunks):
+        if not valid:
+            yield lineno, {"__error__": "Invalid UTF-8"}
+            continue
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            yield lineno, {"__error__": "Invalid JSON"}
+            continue
+        yield lineno, value if isinstance(value, dict) else {"__error__": "Expected a JSON object"}
+
+async def _category_ids(db: AsyncSession, user: Principal, names: set[str], known: dict[str, uuid.UUID], seq: int) -> None:
+    missing = names - known.keys()
+    if not missing:
+        return
+    res = await db.execute(select(Category.name, Category.id).where(Category.user_id == user.id, Category.name.in_(missing)))
+    known.update({name: id_ for name, id_ in res})
+    missing -= known.keys()
+    if missing:
+        stmt = (
+            pg_insert(Category)
+            .values([{"id": uuid.uuid4(), "user_id": user.id, "name": name, "created_at": utcnow(), "change_seq": seq} for name in missing])
+            .on_conflict_do_nothing(constraint="uq_categories_user_name")
+            .returning(Category.name, Category.id)
+        )
+        known.update({name: id_ for name, id_ in await db.execute(stmt)})
+
+async def _flush(db: AsyncSession, user: Principal, rows: list[tuple[int, dict]], categories: dict, report) -> int:
+    # one seq for the chunk: its categories and tasks reach the change feed together
+    seq = await next_seq(db, user.id)
+    names = {r["category"] for _, r in rows if r.get("category")}
+    if names:
+        await _category_ids(db, user, names, categories, seq)
+
+    given_ids = {r["data"].category_id for _, r in rows if r["data"].category_id and not r["category"]}
+    owned = set()
+    if given_ids:
+        res = await db.execute(select(Category.id).where(Category.user_id == user.id, Category.id.in_(given_ids)))
+        owned = set(res.scalars())
+
+    now = utcnow()
+    records = []
+    for lineno, row in rows:
+        data: TaskCreate = row["data"]
+        category_id = data.category_id
+        if row.get("category"):
+            category_id = categories.get(row["category"])
+            if category_id is None:
+                report(lineno, "Category could not be created")
+                continue
+        elif category_id is not None and category_id not in owned:
+            report(lineno, "Category not found")
+            continue
+        records.append((
+            uuid.uuid4(), user.id, category_id, data.title, data.description,
+            data.status.value, data.priority.value, data.due_date, now, now, seq,
+        ))
+
+    if records:
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table("tasks", records=records, columns=COPY_COLUMNS)
+        await apply_deltas(db, user.id, Counter(delta_key(r[2], r[5], r[6]) for r in records))
+    await db.commit()
+    await writes_committed(user.id)
+    return len(records)
+
+async def import_tasks(
+    db: AsyncSession,
+    user: Principal,
+    chunks: AsyncIterator[bytes],
+    format: str = "csv",
+    on_progress: Callable[[dict], None] | None = None,
+) -> dict:
+    records = _csv_records(chunks) if format == "csv" else _ndjson_records(chunks)
+    summary = {"rows": 0, "imported": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    categories: dict[str, uuid.UUID] = {}
+
+    def report(lineno: int, error) -> None:
+        summary["failed"] += 1
+        if len(summary["errors"]) < settings.import_max_errors:
+            summary["errors"].append({"line": lineno, "error": error})
+        else:
+            summary["errors_truncated"] = True
+
+    pending: list[tuple[int, dict]] = []
+    async for lineno, raw in records:
+        summary["rows"] += 1
+        if "__error__" in raw:
+            report(lineno, raw["__error__"])
+            continue
+        fields = {k: v for k, v in raw.items() if k in IMPORT_FIELDS and v not in ("", None)}
+        category = fields.pop("category", None)
+        try:
+            data = TaskCreate.model_validate(fields)
+        except ValidationError as e:
+            report(lineno, e.errors(include_url=False, include_context=False))
+            continue
+        pending.append((lineno, {"data": data, "category": category}))
+
+        if len(pending) >= settings.import_chunk_size:
+            summary["imported"] += await _flush(db, user, pending, categories, report)
+            pending = []
+            if on_progress:
+                on_progress(summary)
+
+    if pending:
+        summary["imported"] += await _flush(db, user, pending, categories, report)
+        if on_progress:
+            on_progress(summary)
+    return summary
@@ -0,0 +1,156 @@
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+from sqlalchemy import select, delete, text
+from datetime import date, datetime, timezone
+import asyncio
+import logging
+
+from app.models.refresh_token import RefreshToken
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# any fixed key works; it only has to be the same in every worker
+MAINTENANCE_LOCK_KEY = 0x72746B6E
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+def _next_month(d: date) -> date:
+    return date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+def _partition_name(month: date) -> str:
+    return f"refresh_tokens_{month:%Y%m}"
+
+async def _purge_where(db: AsyncSession, cond, batch_size: int) -> int:
+    # Small batches, each its own transaction: row locks are held briefly and
+    # SKIP LOCKED lets a concurrent purge (another worker) take other rows.
+    purged = 0
+    while True:
+        victims = (
+            select(RefreshToken.id)
+            .where(cond)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        res = await db.execute(delete(RefreshToken).where(RefreshToken.id.in_(victims.scalar_subquery())))
+        await db.commit()
+        purged += res.rowcount
+        if res.rowcount < batch_size:
+            return purged
+
+async def purge_refresh_tokens(db: AsyncSession, batch_size: int | None = None, wait: bool = False) -> dict:
+    # wait: block on partition maintenance held by another process instead
+    # of leaving it to that process (the CLI waits; the in-app loop doesn't)
+    batch_size = batch_size or settings.refresh_token_purge_batch_size
+    dropped = []
+    conn = await db.connection()
+    if await is_partitioned(conn):
+        # whole expired months first, so the row deletes below only see stragglers
+        dropped = await maintain_partitions(conn, wait=wait)
+    await db.commit()
+
+    now = utcnow()
+    # two passes so each batch query walks a single index
+    return {
+        "dropped_partitions": dropped,
+        "expired": await _purge_where(db, RefreshToken.expires_at <= now, batch_size),
+        "revoked": await _purge_where(db, RefreshToken.revoked_at.is_not(None), batch_size),
+    }
+
+async def reindex_refresh_tokens(conn: AsyncConnection) -> None:
+    # rebuilds the indexes bloated by purges; must run outside a transaction
+    await conn.execute(text("REINDEX TABLE CONCURRENTLY refresh_tokens"))
+
+# --- optional monthly partitions on expires_at ---------------------------------
+#
+# Once converted, a whole month of tokens goes away with DROP TABLE instead of
+# row deletes, and the purge above only has revoked rows of live months left.
+# Postgres requires the partition key in every unique constraint, so the
+# primary key becomes (id, expires_at) and jti is unique per (jti, expires_at);
+# jti values are random 192-bit strings, so that is still effectively unique.
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    res = await conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('refresh_tokens'))"
+    ))
+    return bool(res.scalar())
+
+async def _create_partition(conn: AsyncConnection, month: date) -> None:
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF refresh_tokens "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+    ))
+
+async def maintain_partitions(conn: AsyncConnection, months_ahead: int | None = None, wait: bool = False) -> list[str]:
+    # Creates the coming months' partitions and drops months that have fully
+    # expired. The advisory lock keeps concurrent workers' DDL from colliding:
+    # without wait, a worker that finds it taken skips this round, since the
+    # holder is doing the same work.
+    months_ahead = settings.refresh_token_partition_months_ahead if months_ahead is None else months_ahead
+    if wait:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": MAINTENANCE_LOCK_KEY})
+    else:
+        locked = await conn.execute(text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": MAINTENANCE_LOCK_KEY})
+        if not locked.scalar():
+            logger.info("refresh token partition maintenance skipped: running elsewhere")
+            return []
+
+    month = _month_start(utcnow().date())
+    for _ in range(months_ahead + 1):
+        await _create_partition(conn, month)
+        month = _next_month(month)
+
+    current = _partition_name(_month_start(utcnow().date()))
+    res = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('refresh_tokens') AND c.relname ~ '^refresh_tokens_[0-9]{6}$'"
+    ))
+    dropped = sorted(name for name in res.scalars() if name < current)
+    for name in dropped:
+        await conn.execute(text(f"DROP TABLE {name}"))
+    return dropped
+
+async def partition_refresh_tokens(conn: AsyncConnection) -> int:
+    # One-off conversion to the partitioned layout, run in a single
+    # transaction. Only live tokens are carried over.
+    if await is_partitioned(conn):
+        return 0
+    await conn.execute(text("ALTER TABLE refresh_tokens RENAME TO refresh_tokens_legacy"))
+    await conn.execute(text(
+        "CREATE TABLE refresh_tokens (LIKE refresh_tokens_legacy INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (expires_at)"
+    ))
+    # safety net only: months_ahead must cover refresh_token_expire_days, since
+    # a month can't be created once the default partition holds rows for it
+    await conn.execute(text("CREATE TABLE refresh_tokens_default PARTITION OF refresh_tokens DEFAULT"))
+    await maintain_partitions(conn, wait=True)
+    res = await conn.execute(text(
+        "INSERT INTO refresh_tokens SELECT * FROM refresh_tokens_legacy "
+        "WHERE expires_at > now() AND revoked_at IS NULL"
+    ))
+    await conn.execute(text("DROP TABLE refresh_tokens_legacy"))
+    for ddl in (
+        "ALTER TABLE refresh_tokens ADD PRIMARY KEY (id, expires_at)",
+        "ALTER TABLE refresh_tokens ADD FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE",
+        "CREATE UNIQUE INDEX ix_refresh_tokens_jti ON refresh_tokens (jti, expires_at)",
+        "CREATE INDEX ix_refresh_tokens_user_id ON refresh_tokens (user_id)",
+        "CREATE INDEX ix_refresh_tokens_user_revoked ON refresh_tokens (user_id, revoked_at)",
+        "CREATE INDEX ix_refresh_tokens_expires_at ON refresh_tokens (expires_at)",
+        "CREATE INDEX ix_refresh_tokens_revoked_at ON refresh_tokens (revoked_at) WHERE revoked_at IS NOT NULL",
+    ):
+        await conn.execute(text(ddl))
+    return res.rowcount
+
+async def purge_periodically(session_factory, interval_seconds: float) -> None:
+    # in-app alternative to a cron'd CLI run; safe to run in every worker
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with session_factory() as db:
+                summary = await purge_refresh_tokens(db)
+            logger.info("refresh token purge: %s", summary)
+        except Exception:
+            logger.exception("refresh token purge failed")
@@ -0,0 +1,121 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, text, literal, BigInteger
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
+from collections import Counter
+from datetime import date, timedelta
+import uuid
+
+from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.task_counter import task_counters
+
+# Per-user task counts by (category, status, priority). Writes collect
+# deltas keyed like the counter rows and apply them in the transaction that
+# changes the tasks; rebuild_task_counters() repairs any drift.
+
+def delta_key(category_id, status, priority) -> tuple:
+    return category_id, TaskStatus(status), TaskPriority(priority)
+
+def _lock_order(key: tuple) -> tuple:
+    category_id, status, priority = key
+    return str(category_id or ""), status.value, priority.value
+
+def _upsert(user_id: uuid.UUID, deltas: Counter):
+    # rows in a fixed order, so concurrent writers for one user lock them alike
+    rows = [
+        {"user_id": user_id, "category_id": key[0], "status": key[1], "priority": key[2], "count": deltas[key]}
+        for key in sorted(deltas, key=_lock_order)
+        if deltas[key]
+    ]
+    if not rows:
+        return None
+    return _add_on_conflict(pg_insert(task_counters).values(rows))
+
+def _add_on_conflict(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "category_id", "status", "priority"],
+        set_={"count": task_counters.c.count + stmt.excluded.count},
+    )
+
+# as a data-modifying CTE, for writes whose deltas are known up front (creates)
+def counters_cte(user_id: uuid.UUID, deltas: Counter):
+    return _upsert(user_id, deltas).returning(task_counters.c.count).cte("counter_delta")
+
+# -1 per row of a deleting CTE returning category_id/status/priority, so a
+# delete takes its counter row along in the same statement
+def removed_counters_cte(user_id: uuid.UUID, gone):
+    stmt = pg_insert(task_counters).from_select(
+        ["user_id", "category_id", "status", "priority", "count"],
+        select(literal(user_id, UUID(as_uuid=True)), gone.c.category_id, gone.c.status, gone.c.priority, literal(-1, BigInteger)),
+    )
+    return _add_on_conflict(stmt).returning(task_counters.c.count).cte("counter_delta")
+
+async def apply_deltas(db: AsyncSession, user_id: uuid.UUID, deltas: Counter) -> None:
+    stmt = _upsert(user_id, deltas)
+    if stmt is not None:
+        await db.execute(stmt)
+
+# category reads with ?counts=true: output names and the matching columns,
+# correlated per category row (an index range over at most 9 counter rows)
+CATEGORY_COUNT_FIELDS = ("open_task_count", "task_count")
+
+def category_count_columns(category_id_col, user_id_col) -> list:
+    def total(*conds):
+        return select(func.coalesce(func.sum(task_counters.c.count), 0).cast(BigInteger)).where(
+            task_counters.c.user_id == user_id_col, task_counters.c.category_id == category_id_col, *conds
+        ).scalar_subquery()
+    return [total(task_counters.c.status != TaskStatus.done), total()]
+
+async def rebuild_task_counters(db: AsyncSession, user_id: uuid.UUID | None = None) -> int:
+    # Recount from tasks. The lock makes concurrent writers wait for the
+    # rebuild, and their uncommitted tasks are invisible to it, so their own
+    # deltas land on top of the rebuilt rows afterwards.
+    await db.execute(text("LOCK TABLE task_counters IN SHARE ROW EXCLUSIVE MODE"))
+    clear = delete(task_counters)
+    source = (
+        select(Task.user_id, Task.category_id, Task.status, Task.priority, func.count())
+        .group_by(Task.user_id, Task.category_id, Task.status, Task.priority)
+    )
+    if user_id is not None:
+        clear = clear.where(task_counters.c.user_id == user_id)
+        source = source.where(Task.user_id == user_id)
+    await db.execute(clear)
+    res = await db.execute(
+        task_counters.insert().from_select(["user_id", "category_id", "status", "priority", "count"], source)
+    )
+    await db.commit()
+    return res.rowcount
+
+async def task_stats(db: AsyncSession, user_id: uuid.UUID, today: date) -> dict:
+    res = await db.execute(
+        select(task_counters.c.category_id, task_counters.c.status, task_counters.c.priority, task_counters.c.count)
+        .where(task_counters.c.user_id == user_id, task_counters.c.count > 0)
+    )
+    by_status = {s.value: 0 for s in TaskStatus}
+    by_priority = {p.value: 0 for p in TaskPriority}
+    by_category: dict = {}
+    for category_id, status, priority, n in res:
+        by_status[status.value] += n
+        by_priority[priority.value] += n
+        group = by_category.setdefault(category_id, {"category_id": category_id, "total": 0, "by_status": {s.value: 0 for s in TaskStatus}})
+        group["total"] += n
+        group["by_status"][status.value] += n
+
+    # Date-relative counts can't be kept as counters; open tasks due before
+    # the end of the week are one range over ix_tasks_user_status_due_date_id.
+    week_end = today + timedelta(days=7 - today.weekday())
+    open_statuses = [TaskStatus.todo, TaskStatus.doing]
+    overdue, due_this_week = (await db.execute(
+        select(
+            func.count().filter(Task.due_date < today),
+            func.count().filter(Task.due_date >= today),
+        ).where(Task.user_id == user_id, Task.status.in_(open_statuses), Task.due_date < week_end)
+    )).one()
+
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_priority": by_priority,
+        "by_category": sorted(by_category.values(), key=lambda g: (-g["total"], str(g["category_id"] or ""))),
+        "overdue": overdue,
+        "due_this_week": due_this_week,
+    }
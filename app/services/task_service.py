@@ -1,11 +1,22 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func, insert, update, delete, false
+from sqlalchemy.orm import defer
 from fastapi import HTTPException
+from pydantic import ValidationError
+import re
 import uuid
-from datetime import date
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
 
-from app.models.task import Task, TaskStatus, TaskPriority
-from app.models.user import User
+from app.models.task import Task, TaskStatus, TaskPriority, SEARCH_CONFIG
+from app.models.category import Category
+from app.schemas.task import TaskCreate, TaskUpdate, TaskOut
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.services.change_service import bump_version, bump_first, bumped_seq, lock_version, next_seq, tombstones_cte, writes_committed
+from app.core.pagination import encode_cursor, decode_cursor, keyset_order, keyset_after, fetch_page
+from app.core.serialization import projection
+from app.services.task_counter_service import counters_cte, removed_counters_cte, apply_deltas, delta_key
 
 SORT_FIELDS = {
     "created_at": Task.created_at,
@@ -15,44 +26,322 @@ SORT_FIELDS = {
     "title": Task.title,
 }
 
-async def create_task(db: AsyncSession, user: User, data) -> Task:
-    task = Task(
-        user_id=user.id,
-        title=data.title,
-        description=data.description,
-        category_id=data.category_id,
-        status=data.status,
-        priority=data.priority,
-        due_date=data.due_date,
+# Reads select TaskOut's columns (or the ?fields= subset) as plain rows, in
+# field order, and the router encodes them directly (app.core.serialization)
+TASK_OUT_FIELDS = tuple(TaskOut.model_fields)
+
+# the columns task_counters are keyed on (besides user_id)
+COUNTED_FIELDS = {"category_id", "status", "priority"}
+COUNTED_COLUMNS = (Task.category_id, Task.status, Task.priority)
+
+# keeps the tsvector out of ORM INSERT/UPDATE ... RETURNING(Task); not every
+# SQLAlchemy 2.x applies deferred=True to DML RETURNING by itself
+NO_SEARCH_VECTOR = defer(Task.search_vector)
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+_SEARCH_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w+")
+
+# Bare words are ANDed, "quoted text" is a phrase and a trailing * makes a word
+# a prefix match (plan* -> plan:*). Only \w characters reach to_tsquery, so
+# user input can never inject tsquery operators.
+def build_search_query(q: str) -> str | None:
+    parts = []
+    for phrase, term in _SEARCH_TOKEN.findall(q):
+        words = _WORD.findall(phrase if phrase else term)
+        if not words:
+            continue
+        if term.endswith("*"):
+            words[-1] += ":*"
+        parts.append(words[0] if len(words) == 1 else "(" + " <-> ".join(words) + ")")
+    return " & ".join(parts) or None
+
+async def create_task(db: AsyncSession, user: Principal, data) -> Task:
+    now = utcnow()
+    bump = bump_version(user.id)
+    res = await db.execute(
+        insert(Task)
+        .values(
+            id=uuid.uuid4(),
+            user_id=user.id,
+            title=data.title,
+            description=data.description,
+            category_id=data.category_id,
+            status=data.status,
+            priority=data.priority,
+            due_date=data.due_date,
+            created_at=now,
+            updated_at=now,
+            change_seq=bumped_seq(bump),
+        )
+        .returning(Task)
+        .options(NO_SEARCH_VECTOR)
+        .add_cte(bump)
+        .add_cte(counters_cte(user.id, Counter({delta_key(data.category_id, data.status, data.priority): 1})))
     )
-    db.add(task)
+    task = res.scalar_one()
     await db.commit()
-    await db.refresh(task)
+    await writes_committed(user.id)
     return task
 
-async def get_task(db: AsyncSession, user: User, task_id: uuid.UUID) -> Task:
+async def get_task(db: AsyncSession, user: Principal, task_id: uuid.UUID) -> Task:
     res = await db.execute(select(Task).where(Task.id == task_id, Task.user_id == user.id))
     task = res.scalar_one_or_none()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
-async def update_task(db: AsyncSession, user: User, task_id: uuid.UUID, data) -> Task:
-    task = await get_task(db, user, task_id)
-    for field, value in data.model_dump(exclude_unset=True).items():
-        setattr(task, field, value)
+async def get_task_row(db: AsyncSession, user: Principal, task_id: uuid.UUID, fields=TASK_OUT_FIELDS):
+    # the requested columns plus updated_at for the ETag; no ORM object
+    stmt = select(*projection(Task.__table__, fields, "updated_at")).where(Task.id == task_id, Task.user_id == user.id)
+    row = (await db.execute(stmt)).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return row
+
+# a write matched no row: either the task is gone or If-Match was stale
+async def _missing_or_stale(db: AsyncSession, user: Principal, task_id: uuid.UUID, expected_updated_at) -> None:
+    if expected_updated_at is not None:
+        await get_task(db, user, task_id)
+        raise HTTPException(status_code=412, detail="Task was modified")
+    raise HTTPException(status_code=404, detail="Task not found")
+
+async def update_task(
+    db: AsyncSession,
+    user: Principal,
+    task_id: uuid.UUID,
+    data,
+    expected_updated_at: datetime | None = None,
+) -> Task:
+    fields = data.model_dump(exclude_unset=True)
+    if not fields:
+        task = await get_task(db, user, task_id)
+        if expected_updated_at is not None and task.updated_at != expected_updated_at:
+            raise HTTPException(status_code=412, detail="Task was modified")
+        return task
+
+    conds = [Task.id == task_id, Task.user_id == user.id]
+    if expected_updated_at is not None:
+        conds.append(Task.updated_at == expected_updated_at)
+    bump = bump_version(user.id)
+    if COUNTED_FIELDS.intersection(fields):
+        # the old key, locked so it can't change before the update; the bump
+        # runs here, ahead of the row lock, and the counter deltas then ride
+        # along with the update
+        locked = await db.execute(
+            select(bumped_seq(bump).label("seq"), *COUNTED_COLUMNS)
+            .where(*conds, bump_first(bump))
+            .with_for_update(of=Task)
+            .add_cte(bump)
+        )
+        old = locked.one_or_none()
+        if old is None:
+            await _missing_or_stale(db, user, task_id, expected_updated_at)
+        new = {**old._asdict(), **{f: fields[f] for f in COUNTED_FIELDS if f in fields}}
+        deltas = Counter({delta_key(old.category_id, old.status, old.priority): -1})
+        deltas[delta_key(new["category_id"], new["status"], new["priority"])] += 1
+        stmt = update(Task).where(*conds).values(**fields, updated_at=utcnow(), change_seq=old.seq)
+        if any(deltas.values()):
+            stmt = stmt.add_cte(counters_cte(user.id, deltas))
+    else:
+        stmt = (
+            update(Task)
+            .where(*conds, bump_first(bump))
+            .values(**fields, updated_at=utcnow(), change_seq=bumped_seq(bump))
+            .add_cte(bump)
+        )
+
+    # nothing to synchronize: the session holds no copy of the task, and the
+    # default would try (and fail) to evaluate bump_first() in Python
+    stmt = stmt.returning(Task).options(NO_SEARCH_VECTOR).execution_options(synchronize_session=False)
+    task = (await db.execute(stmt)).scalar_one_or_none()
+    if not task:
+        await _missing_or_stale(db, user, task_id, expected_updated_at)
     await db.commit()
-    await db.refresh(task)
+    await writes_committed(user.id)
     return task
 
-async def delete_task(db: AsyncSession, user: User, task_id: uuid.UUID) -> None:
-    task = await get_task(db, user, task_id)
-    await db.delete(task)
+async def delete_task(
+    db: AsyncSession,
+    user: Principal,
+    task_id: uuid.UUID,
+    expected_updated_at: datetime | None = None,
+) -> None:
+    conds = [Task.id == task_id, Task.user_id == user.id]
+    if expected_updated_at is not None:
+        conds.append(Task.updated_at == expected_updated_at)
+    bump = bump_version(user.id)
+    gone = delete(Task).where(*conds, bump_first(bump)).returning(Task.id, *COUNTED_COLUMNS).cte("gone")
+    res = await db.execute(
+        select(gone.c.id)
+        .add_cte(bump)
+        .add_cte(tombstones_cte(user.id, "task", gone.c.id, bumped_seq(bump), utcnow()))
+        .add_cte(removed_counters_cte(user.id, gone))
+    )
+    if res.scalar_one_or_none() is None:
+        await _missing_or_stale(db, user, task_id, expected_updated_at)
     await db.commit()
+    await writes_committed(user.id)
 
-async def list_tasks(
-    db: AsyncSession,
-    user: User,
+async def uncategorize_tasks(db: AsyncSession, user: Principal, category_id: uuid.UUID, seq: int) -> int:
+    # For a category being deleted: its tasks are moved out here rather than
+    # by the foreign key's SET NULL, so their updated_at (ETags), change_seq
+    # and the counters follow. Caller bumps the version and commits.
+    moved = (
+        update(Task)
+        .where(Task.user_id == user.id, Task.category_id == category_id)
+        .values(category_id=None, updated_at=utcnow(), change_seq=seq)
+        .returning(Task.status, Task.priority)
+        .cte("moved")
+    )
+    res = await db.execute(select(moved.c.status, moved.c.priority, func.count()).group_by(moved.c.status, moved.c.priority))
+    deltas = Counter()
+    for status, priority, n in res:
+        deltas[delta_key(category_id, status, priority)] -= n
+        deltas[delta_key(None, status, priority)] += n
+    await apply_deltas(db, user.id, deltas)
+    return sum(n for n in deltas.values() if n > 0)
+
+async def batch_tasks(db: AsyncSession, user: Principal, ops, atomic: bool) -> dict:
+    results: dict[int, dict] = {}
+    creates: list[tuple[int, dict]] = []
+    updates: list[tuple[int, uuid.UUID, dict]] = []
+    deletes: list[tuple[int, uuid.UUID]] = []
+
+    def fail(index: int, status: int, error, task_id: uuid.UUID | None = None):
+        results[index] = {"index": index, "op": ops[index].op, "status": status, "id": task_id, "error": error}
+
+    seen_ids: set[uuid.UUID] = set()
+    for index, op in enumerate(ops):
+        if op.op != "create":
+            if op.id is None:
+                fail(index, 422, "id is required")
+                continue
+            if op.id in seen_ids:
+                fail(index, 409, "Task appears more than once in batch", op.id)
+                continue
+            seen_ids.add(op.id)
+        try:
+            if op.op == "create":
+                creates.append((index, TaskCreate.model_validate(op.data or {}).model_dump()))
+            elif op.op == "update":
+                updates.append((index, op.id, TaskUpdate.model_validate(op.data or {}).model_dump(exclude_unset=True)))
+            else:
+                deletes.append((index, op.id))
+        except ValidationError as e:
+            fail(index, 422, e.errors(include_url=False, include_context=False), op.id)
+
+    # ownership of every referenced task and category, one query each; the
+    # tasks' counter keys are read and locked here for the deltas below,
+    # after the user row, as in every write
+    keys: dict[uuid.UUID, tuple] = {}
+    if seen_ids:
+        await lock_version(db, user.id)
+        res = await db.execute(
+            select(Task.id, *COUNTED_COLUMNS)
+            .where(Task.user_id == user.id, Task.id.in_(seen_ids))
+            .order_by(Task.id)
+            .with_for_update()
+        )
+        keys = {task_id: delta_key(*key) for task_id, *key in res}
+        owned = set(keys)
+        for index, task_id, _ in updates:
+            if task_id not in owned:
+                fail(index, 404, "Task not found", task_id)
+        for index, task_id in deletes:
+            if task_id not in owned:
+                fail(index, 404, "Task not found", task_id)
+
+    category_ids = {data["category_id"] for _, data in creates if data["category_id"]}
+    category_ids |= {data["category_id"] for _, _, data in updates if data.get("category_id")}
+    if category_ids:
+        res = await db.execute(select(Category.id).where(Category.user_id == user.id, Category.id.in_(category_ids)))
+        owned_categories = set(res.scalars())
+        for index, data in creates:
+            if data["category_id"] and data["category_id"] not in owned_categories:
+                fail(index, 404, "Category not found")
+        for index, task_id, data in updates:
+            if data.get("category_id") and data["category_id"] not in owned_categories:
+                fail(index, 404, "Category not found", task_id)
+
+    if results and atomic:
+        for index, op in enumerate(ops):
+            if index not in results:
+                results[index] = {
+                    "index": index, "op": op.op, "status": 424, "id": op.id,
+                    "error": "Not applied: another operation in the batch failed",
+                }
+        return {"committed": False, "results": [results[i] for i in range(len(ops))]}
+
+    creates = [c for c in creates if c[0] not in results]
+    updates = [u for u in updates if u[0] not in results]
+    deletes = [d for d in deletes if d[0] not in results]
+    if not (creates or updates or deletes):
+        # every op failed: leave data_version, and the caches and ETags
+        # keyed by it, alone
+        await db.rollback()
+        return {"committed": False, "results": [results[i] for i in range(len(ops))]}
+
+    # the remaining updates and deletes target rows locked above, so each
+    # of them applies and the bump is never for nothing
+    now = utcnow()
+    seq = await next_seq(db, user.id)
+
+    deltas = Counter()
+    for _, data in creates:
+        deltas[delta_key(data["category_id"], data["status"], data["priority"])] += 1
+    for _, task_id, data in updates:
+        old = keys[task_id]
+        deltas[old] -= 1
+        deltas[delta_key(data.get("category_id", old[0]), data.get("status", old[1]), data.get("priority", old[2]))] += 1
+    for _, task_id in deletes:
+        deltas[keys[task_id]] -= 1
+    await apply_deltas(db, user.id, deltas)
+
+    if creates:
+        rows = [
+            {"id": uuid.uuid4(), "user_id": user.id, "created_at": now, "updated_at": now, "change_seq": seq, **data}
+            for _, data in creates
+        ]
+        res = await db.scalars(insert(Task).returning(Task, sort_by_parameter_order=True).options(NO_SEARCH_VECTOR), rows)
+        for (index, _), task in zip(creates, res.all()):
+            results[index] = {"index": index, "op": "create", "status": 200, "id": task.id, "item": task}
+
+    if updates:
+        # ORM bulk UPDATE by primary key: executemany, grouped by the set of changed columns
+        await db.execute(
+            update(Task).where(Task.user_id == user.id),
+            [{"id": task_id, **fields, "updated_at": now, "change_seq": seq} for _, task_id, fields in updates],
+            execution_options={"synchronize_session": None},
+        )
+        res = await db.execute(
+            select(Task)
+            .where(Task.id.in_([task_id for _, task_id, _ in updates]))
+            .execution_options(populate_existing=True)
+        )
+        by_id = {task.id: task for task in res.scalars()}
+        for index, task_id, _ in updates:
+            results[index] = {"index": index, "op": "update", "status": 200, "id": task_id, "item": by_id[task_id]}
+
+    if deletes:
+        gone = (
+            delete(Task)
+            .where(Task.user_id == user.id, Task.id.in_([task_id for _, task_id in deletes]))
+            .returning(Task.id)
+            .cte("gone")
+        )
+        await db.execute(select(func.count()).select_from(gone).add_cte(tombstones_cte(user.id, "task", gone.c.id, seq, now)))
+        for index, task_id in deletes:
+            results[index] = {"index": index, "op": "delete", "status": 200, "id": task_id}
+
+    await db.commit()
+    await writes_committed(user.id)
+    return {"committed": True, "results": [results[i] for i in range(len(ops))]}
+
+def _task_filters(
+    user: Principal,
     q: str | None,
     status: TaskStatus | None,
     priority: TaskPriority | None,
@@ -61,60 +350,137 @@ async def list_tasks(
     due_to: date | None,
     created_from: date | None,
     created_to: date | None,
-    sort: str,
-    page: int,
-    page_size: int,
 ):
-    stmt = select(Task).where(Task.user_id == user.id)
-    count_stmt = select(func.count()).select_from(Task).where(Task.user_id == user.id)
-
-    if q:
-        ql = f"%{q.lower()}%"
-        cond = or_(
-            func.lower(Task.title).like(ql),
-            func.lower(func.coalesce(Task.description, "")).like(ql),
-        )
-        stmt = stmt.where(cond)
-        count_stmt = count_stmt.where(cond)
+    conds = [Task.user_id == user.id]
+
+    ts_query = None
+    if q and q.strip():
+        query_text = build_search_query(q)
+        if query_text:
+            ts_query = func.to_tsquery(SEARCH_CONFIG, query_text)
+            conds.append(Task.search_vector.op("@@")(ts_query))
+        else:
+            # no words at all (e.g. "!!!"): matches nothing rather than
+            # dropping the filter
+            conds.append(false())
 
     if status:
-        stmt = stmt.where(Task.status == status)
-        count_stmt = count_stmt.where(Task.status == status)
+        conds.append(Task.status == status)
 
     if priority:
-        stmt = stmt.where(Task.priority == priority)
-        count_stmt = count_stmt.where(Task.priority == priority)
+        conds.append(Task.priority == priority)
 
     if category_id:
-        stmt = stmt.where(Task.category_id == category_id)
-        count_stmt = count_stmt.where(Task.category_id == category_id)
+        conds.append(Task.category_id == category_id)
 
     if due_from:
-        stmt = stmt.where(Task.due_date >= due_from)
-        count_stmt = count_stmt.where(Task.due_date >= due_from)
+        conds.append(Task.due_date >= due_from)
     if due_to:
-        stmt = stmt.where(Task.due_date <= due_to)
-        count_stmt = count_stmt.where(Task.due_date <= due_to)
+        conds.append(Task.due_date <= due_to)
 
-    # created_* are date-only filters; compare against date portion
+    # created_* are inclusive UTC dates; compare the bare column against a
+    # half-open [from 00:00, to+1 00:00) range so the index can be used
     if created_from:
-        stmt = stmt.where(func.date(Task.created_at) >= created_from)
-        count_stmt = count_stmt.where(func.date(Task.created_at) >= created_from)
+        conds.append(Task.created_at >= _utc_midnight(created_from))
     if created_to:
-        stmt = stmt.where(func.date(Task.created_at) <= created_to)
-        count_stmt = count_stmt.where(func.date(Task.created_at) <= created_to)
+        conds.append(Task.created_at < _utc_midnight(created_to + timedelta(days=1)))
+
+    return conds, ts_query
+
+def _utc_midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+def _sort_field(sort: str) -> tuple[str, bool]:
+    desc = sort.startswith("-")
+    field = sort[1:] if desc else sort
+    if field not in SORT_FIELDS:
+        field = "created_at"
+    return field, desc
+
+async def list_tasks(
+    db: AsyncSession,
+    user: Principal,
+    q: str | None,
+    status: TaskStatus | None,
+    priority: TaskPriority | None,
+    category_id: uuid.UUID | None,
+    due_from: date | None,
+    due_to: date | None,
+    created_from: date | None,
+    created_to: date | None,
+    sort: str,
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+    total_mode: str = "exact",
+    fields=TASK_OUT_FIELDS,
+):
+    conds, ts_query = _task_filters(
+        user, q, status, priority, category_id,
+        due_from, due_to, created_from, created_to,
+    )
+    field, desc = _sort_field(sort)
+    # next_cursor is built from the sort key and id, so both are selected
+    stmt = select(*projection(Task.__table__, fields, field, "id")).where(*conds)
+    count_stmt = select(func.count()).select_from(Task).where(*conds)
+
+    relevance = sort == "relevance" and ts_query is not None
+    if relevance:
+        # rank is computed per row, so relevance ordering is offset-only
+        if cursor:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not supported for relevance sort")
+        stmt = stmt.order_by(func.ts_rank_cd(Task.search_vector, ts_query).desc(), Task.id)
+    else:
+        sort = f"-{field}" if desc else field
+        order_col = SORT_FIELDS[field]
+        stmt = stmt.order_by(*keyset_order(order_col, Task.id, desc))
 
-    desc = False
-    field = sort
-    if sort.startswith("-"):
-        desc = True
-        field = sort[1:]
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort, order_col)
+            stmt = stmt.where(keyset_after(order_col, Task.id, value, last_id, desc))
 
-    order_col = SORT_FIELDS.get(field, Task.created_at)
-    stmt = stmt.order_by(order_col.desc() if desc else order_col.asc())
+    items, total, has_more = await fetch_page(
+        db, stmt, count_stmt,
+        offset=None if cursor else (page-1)*page_size,
+        page_size=page_size,
+        total_mode=total_mode,
+        rows=True,
+    )
+
+    next_cursor = None
+    if has_more and not relevance:
+        last = items[-1]
+        next_cursor = encode_cursor(sort, getattr(last, field), last.id)
+    return items, total, has_more, next_cursor
 
-    stmt = stmt.offset((page-1)*page_size).limit(page_size)
+# every TaskOut column: not the deferred search vector or the change feed's seq
+EXPORT_COLUMNS = [c for c in Task.__table__.columns if c.key not in ("search_vector", "change_seq")]
 
-    total = (await db.execute(count_stmt)).scalar_one()
-    items = (await db.execute(stmt)).scalars().all()
-    return items, total
+async def export_tasks(
+    db: AsyncSession,
+    user: Principal,
+    q: str | None,
+    status: TaskStatus | None,
+    priority: TaskPriority | None,
+    category_id: uuid.UUID | None,
+    due_from: date | None,
+    due_to: date | None,
+    created_from: date | None,
+    created_to: date | None,
+    sort: str,
+):
+    conds, _ = _task_filters(
+        user, q, status, priority, category_id,
+        due_from, due_to, created_from, created_to,
+    )
+    field, desc = _sort_field(sort)
+    # plain column rows (no ORM identity map) fetched through a server-side cursor
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .where(*conds)
+        .order_by(*keyset_order(SORT_FIELDS[field], Task.id, desc))
+        .execution_options(yield_per=settings.export_batch_size)
+    )
+    result = await db.stream(stmt)
+    async for row in result.mappings():
+        yield row
@@ -10,6 +10,8 @@ from sqlalchemy.pool import NullPool
 
 from app.main import create_app
 from app.core.db import get_db
+from app.core.rate_limit import limiter
+from app.core.cache import result_cache
 
 from app.core.db import Base
 
@@ -49,6 +51,8 @@ def session_maker(engine):
 @pytest.fixture(scope="function")
 async def client(session_maker):
     app = create_app()
+    limiter.reset()
+    await result_cache.clear()
 
     async def _override_get_db():
         async with session_maker() as session:
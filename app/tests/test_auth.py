@@ -1,3 +1,4 @@
+import uuid
 import pytest
 
 @pytest.mark.anyio
@@ -23,3 +24,130 @@ async def test_register_login_refresh_logout(client):
     r = await client.post("/auth/logout", json={"refresh_token": new_tokens["refresh_token"]})
     assert r.status_code == 200
     assert r.json()["ok"] is True
+
+@pytest.mark.anyio
+async def test_login_rehashes_outdated_password_hash(client, session_maker):
+    from passlib.context import CryptContext
+    from sqlalchemy import select
+    from app.models.user import User
+
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("password123")
+    async with session_maker() as db:
+        db.add(User(email="old@a.com", password_hash=old_hash))
+        await db.commit()
+
+    r = await client.post("/auth/login", json={"email": "old@a.com", "password": "password123"})
+    assert r.status_code == 200
+
+    async with session_maker() as db:
+        new_hash = (await db.execute(select(User.password_hash).where(User.email == "old@a.com"))).scalar_one()
+    assert new_hash != old_hash
+    assert not new_hash.startswith("$2b$04$")
+
+    r = await client.post("/auth/login", json={"email": "old@a.com", "password": "password123"})
+    assert r.status_code == 200
+
+@pytest.mark.anyio
+async def test_password_hasher_rejects_when_queue_is_full():
+    import asyncio
+    from app.core.password_hasher import PasswordHasher, PasswordHasherBusy
+
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    results = await asyncio.gather(*(hasher.hash("password123") for _ in range(4)), return_exceptions=True)
+    hasher.shutdown()
+
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 2
+    stats = hasher.stats()
+    assert stats["completed"] == 2 and stats["rejected"] == 2 and stats["in_flight"] == 0
+
+@pytest.mark.anyio
+async def test_access_token_cache_and_user_deletion(client, session_maker):
+    from app.core.auth_cache import token_cache
+    from app.models.user import User
+
+    r = await client.post("/auth/register", json={"email": "gone@a.com", "password": "password123"})
+    user_id = r.json()["id"]
+    r = await client.post("/auth/login", json={"email": "gone@a.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    hits = token_cache.hits
+    assert (await client.get("/tasks", headers=headers)).status_code == 200
+    assert (await client.get("/tasks", headers=headers)).status_code == 200
+    assert token_cache.hits == hits + 1
+
+    async with session_maker() as db:
+        await db.delete(await db.get(User, uuid.UUID(user_id)))
+        await db.commit()
+
+    r = await client.get("/tasks", headers=headers)
+    assert r.status_code == 401
+
+@pytest.mark.anyio
+async def test_refresh_token_purge(client, session_maker):
+    from sqlalchemy import func, select, text
+    from app.models.refresh_token import RefreshToken
+    from app.services import refresh_token_service
+
+    await client.post("/auth/register", json={"email": "p@p.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "p@p.com", "password": "password123"})
+    live = r.json()["refresh_token"]
+    for _ in range(2):
+        r = await client.post("/auth/refresh", json={"refresh_token": live})
+        live = r.json()["refresh_token"]
+
+    async with session_maker() as db:
+        await db.execute(text("""
+            INSERT INTO refresh_tokens (id, user_id, jti, token_hash, expires_at, created_at)
+            SELECT gen_random_uuid(), u.id, 'old-' || i, 'x', now() - interval '1 day', now() - interval '15 days'
+            FROM users u, generate_series(1, 7) AS i
+        """))
+        await db.commit()
+
+        summary = await refresh_token_service.purge_refresh_tokens(db, batch_size=3)
+        assert summary["expired"] == 7 and summary["revoked"] == 2
+        assert (await db.execute(select(func.count()).select_from(RefreshToken))).scalar_one() == 1
+
+    r = await client.post("/auth/refresh", json={"refresh_token": live})
+    assert r.status_code == 200
+
+@pytest.mark.anyio
+async def test_refresh_token_partitioning(client, engine, session_maker):
+    import asyncio
+    from sqlalchemy import text
+    from app.services import refresh_token_service
+
+    await client.post("/auth/register", json={"email": "pt@p.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "pt@p.com", "password": "password123"})
+    live = r.json()["refresh_token"]
+
+    async with engine.begin() as conn:
+        assert await refresh_token_service.partition_refresh_tokens(conn) == 1
+        assert await refresh_token_service.is_partitioned(conn)
+        await conn.execute(text(
+            "CREATE TABLE refresh_tokens_200001 PARTITION OF refresh_tokens "
+            "FOR VALUES FROM ('2000-01-01') TO ('2000-02-01')"
+        ))
+
+    # the carried-over token still rotates, and new rows land in a month partition
+    r = await client.post("/auth/refresh", json={"refresh_token": live})
+    assert r.status_code == 200
+
+    async with session_maker() as db:
+        summary = await refresh_token_service.purge_refresh_tokens(db)
+        assert summary["dropped_partitions"] == ["refresh_tokens_200001"]
+        assert summary["revoked"] == 1
+        default_rows = await db.execute(text("SELECT count(*) FROM refresh_tokens_default"))
+        assert default_rows.scalar_one() == 0
+
+    # with another process in the middle of maintenance, the in-app purge
+    # skips it and the CLI's waits for it
+    async with engine.begin() as holder:
+        await holder.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": refresh_token_service.MAINTENANCE_LOCK_KEY})
+        async with engine.begin() as conn:
+            assert await refresh_token_service.maintain_partitions(conn) == []
+        async with engine.begin() as conn:
+            waiting = asyncio.create_task(refresh_token_service.maintain_partitions(conn, wait=True))
+            await asyncio.sleep(0.2)
+            assert not waiting.done()
+            await holder.commit()
+            await asyncio.wait_for(waiting, 5)
@@ -23,3 +23,106 @@ async def test_category_crud(client):
 
     r = await client.delete(f"/categories/{cat['id']}", headers=headers)
     assert r.status_code == 200
+
+@pytest.mark.anyio
+async def test_category_total_modes(client):
+    await client.post("/auth/register", json={"email": "m@m.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "m@m.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    for name in ["A", "B", "C"]:
+        await client.post("/categories", json={"name": name}, headers=headers)
+
+    r = await client.get("/categories?page_size=2", headers=headers)
+    page = r.json()
+    assert page["total"] == 3 and page["total_mode"] == "exact" and page["has_more"] is True
+
+    r = await client.get("/categories?page=3&page_size=2", headers=headers)
+    assert r.json()["total"] == 3 and r.json()["items"] == []
+
+    r = await client.get("/categories?page_size=2&total=none", headers=headers)
+    page = r.json()
+    assert page["total"] is None and page["total_mode"] == "none" and len(page["items"]) == 2
+
+    r = await client.get(f"/categories?page_size=2&total=estimate&cursor={page['next_cursor']}", headers=headers)
+    page = r.json()
+    assert isinstance(page["total"], int) and page["has_more"] is False and len(page["items"]) == 1
+
+@pytest.mark.anyio
+async def test_category_conflicts_and_missing(client):
+    await client.post("/auth/register", json={"email": "k@k.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "k@k.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    missing = "00000000-0000-0000-0000-000000000000"
+
+    await client.post("/categories", json={"name": "Home"}, headers=headers)
+    r = await client.post("/categories", json={"name": "Work"}, headers=headers)
+    work = r.json()
+
+    assert (await client.post("/categories", json={"name": "Home"}, headers=headers)).status_code == 409
+    assert (await client.patch(f"/categories/{work['id']}", json={"name": "Home"}, headers=headers)).status_code == 409
+    assert (await client.patch(f"/categories/{missing}", json={"name": "X"}, headers=headers)).status_code == 404
+    assert (await client.delete(f"/categories/{missing}", headers=headers)).status_code == 404
+
+@pytest.mark.anyio
+async def test_category_task_counts(client):
+    await client.post("/auth/register", json={"email": "n@n.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "n@n.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    work = (await client.post("/categories", json={"name": "Work"}, headers=headers)).json()
+    home = (await client.post("/categories", json={"name": "Home"}, headers=headers)).json()
+    for status in ["todo", "doing", "done"]:
+        await client.post("/tasks", json={"title": status, "status": status, "category_id": work["id"]}, headers=headers)
+
+    r = await client.get("/categories?counts=true", headers=headers)
+    counts = {c["name"]: (c["open_task_count"], c["task_count"]) for c in r.json()["items"]}
+    assert counts == {"Work": (2, 3), "Home": (0, 0)}
+    r = await client.get("/categories?fields=name", headers=headers)
+    assert "task_count" not in r.json()["items"][0]
+
+    r = await client.get(f"/categories/{work['id']}?counts=true&fields=name", headers=headers)
+    assert r.json() == {"name": "Work", "open_task_count": 2, "task_count": 3}
+    etag = r.headers["etag"]
+    assert etag.startswith("W/")
+    r = await client.get(f"/categories/{work['id']}?counts=true&fields=name", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+
+    # a task write changes the counts but not the category itself
+    task = (await client.post("/tasks", json={"title": "more", "category_id": work["id"]}, headers=headers)).json()
+    r = await client.get(f"/categories/{work['id']}?counts=true&fields=name", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["task_count"] == 4
+
+    # deleting the category moves its tasks out, visibly to ETags and counts
+    r = await client.get(f"/tasks/{task['id']}", headers=headers)
+    task_etag = r.headers["etag"]
+    assert (await client.delete(f"/categories/{work['id']}", headers=headers)).status_code == 200
+    r = await client.get(f"/tasks/{task['id']}", headers={**headers, "If-None-Match": task_etag})
+    assert r.status_code == 200 and r.json()["category_id"] is None
+    assert r.json()["updated_at"] != task["updated_at"]
+    r = await client.get("/tasks/stats", headers=headers)
+    assert r.json()["by_category"] == [{"category_id": None, "total": 4, "by_status": {"todo": 2, "doing": 1, "done": 1}}]
+    r = await client.get(f"/categories/{home['id']}?counts=true", headers=headers)
+    assert (r.json()["open_task_count"], r.json()["task_count"]) == (0, 0)
+
+@pytest.mark.anyio
+async def test_category_delete_concurrent_with_task_writes(client):
+    import asyncio
+
+    await client.post("/auth/register", json={"email": "cc@c.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "cc@c.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    # every write locks the user row before tasks and categories, so these
+    # serialize instead of deadlocking
+    for i in range(8):
+        cat = (await client.post("/categories", json={"name": f"C{i}"}, headers=headers)).json()["id"]
+        ids = [
+            (await client.post("/tasks", json={"title": f"t{j}", "category_id": cat}, headers=headers)).json()["id"]
+            for j in range(3)
+        ]
+        responses = await asyncio.gather(
+            client.patch(f"/tasks/{ids[0]}", json={"status": "done"}, headers=headers),
+            client.post("/tasks/batch", json={"ops": [{"op": "update", "id": ids[1], "data": {"priority": "high"}}]}, headers=headers),
+            client.delete(f"/tasks/{ids[2]}", headers=headers),
+            client.delete(f"/categories/{cat}", headers=headers),
+        )
+        assert [r.status_code for r in responses] == [200, 200, 200, 200]
@@ -0,0 +1,131 @@
+import pytest
+import uuid
+
+@pytest.mark.anyio
+async def test_ready_and_pool_stats(client, db_url):
+    from sqlalchemy import text
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.core.db import TimedQueuePool
+    from app.cli import worker_pool
+
+    r = await client.get("/ready")
+    assert r.status_code == 200
+    assert {"checked_out", "overflow", "wait_seconds_total", "timeouts"} <= r.json()["pool"].keys()
+
+    engine = create_async_engine(db_url, poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert engine.pool.stats()["checked_out"] == 1
+            with pytest.raises(PoolTimeout):
+                async with engine.connect():
+                    pass
+        stats = engine.pool.stats()
+        assert stats["timeouts"] == 1 and stats["wait_seconds_max"] >= 0.2
+    finally:
+        await engine.dispose()
+
+    assert worker_pool(60, 4) == (10, 5)
+    assert worker_pool(2, 4) == (1, 0)
+
+@pytest.mark.anyio
+async def test_task_reads_use_replicas(client, db_url, monkeypatch):
+    import asyncio
+    import app.api.deps as deps
+    import app.services.change_service as change_service
+    from app.core.db import ReadRouter
+
+    down_url = db_url.split("?")[0] + "?host=/nonexistent"
+    router = ReadRouter([down_url, db_url], sticky_seconds=0.3)
+    monkeypatch.setattr(deps, "read_router", router)
+    monkeypatch.setattr(change_service, "read_router", router)
+    replica = router.engines[1].pool
+    try:
+        await client.post("/auth/register", json={"email": "rr@r.com", "password": "password123"})
+        r = await client.post("/auth/login", json={"email": "rr@r.com", "password": "password123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = await client.post("/tasks", json={"title": "Replicated"}, headers=headers)
+        pin = r.cookies["rw_pin"]
+
+        # right after a write the user reads from the primary: the pin travels
+        # with the client, so any worker honours it
+        r = await client.get("/tasks", headers=headers)
+        assert r.json()["total"] == 1 and replica.checkouts == 0
+        client.cookies.clear()
+        user_id, until = pin.split(":")
+        assert router.pinned_to_primary(user_id, pin)
+        assert not router.pinned_to_primary(uuid.uuid4(), pin)
+        # one reaching further than read_your_writes_seconds is not ours
+        assert not router.pinned_to_primary(user_id, f"{user_id}:{float(until) + 60}")
+
+        await asyncio.sleep(0.35)
+        r = await client.get("/tasks?page_size=5", headers=headers)
+        assert r.json()["total"] == 1
+        # the unreachable replica is skipped, the healthy one served the read
+        assert replica.checkouts == 1 and [s["up"] for s in router.stats()] == [False, True]
+    finally:
+        for engine in router.engines:
+            await engine.dispose()
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(client, engine):
+    from app.core import metrics
+
+    metrics.instrument_engine(engine, "test")
+    await client.post("/auth/register", json={"email": "m@m.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "m@m.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    r = await client.post("/tasks", json={"title": "Measured"}, headers=headers)
+    await client.get(f"/tasks/{r.json()['id']}", headers=headers)
+    await client.get("/tasks/not-a-uuid", headers=headers)
+
+    r = await client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    # route templates, not raw paths, label the latency histogram
+    assert 'http_request_duration_seconds_count{route="/tasks/{task_id}",method="GET",status="200"}' in body
+    assert 'route="/tasks/{task_id}",method="GET",status="422"' in body
+    assert "/tasks/not-a-uuid" not in body
+    assert 'db_query_duration_seconds_bucket{db="test",kind="insert",le="+Inf"}' in body
+    assert 'db_pool_checked_out{db="primary"}' in body
+    assert "# TYPE result_cache_hits counter" in body
+    assert "http_requests_in_flight 1" in body  # the scrape itself
+
+@pytest.mark.anyio
+async def test_request_timing(client, session_maker, engine, monkeypatch, caplog):
+    import logging
+    from httpx import AsyncClient, ASGITransport
+    from app.core import request_timing
+    from app.core.config import settings
+    from app.core.db import get_db
+    from app.main import create_app
+
+    await client.post("/auth/register", json={"email": "st@s.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "st@s.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    monkeypatch.setattr(settings, "sql_instrumentation", True)
+    monkeypatch.setattr(settings, "sql_budget_queries", 1)
+    request_timing.instrument_engine(engine)
+    app = create_app()
+
+    async def _override_get_db():
+        async with session_maker() as session:
+            yield session
+    app.dependency_overrides[get_db] = _override_get_db
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        with caplog.at_level(logging.WARNING, logger="app.request_timing"):
+            r = await ac.get("/tasks?status=todo", headers=headers)
+    timing = r.headers["server-timing"]
+    assert 'db;dur=' in timing and "auth;dur=" in timing and "serialize;dur=" in timing
+    # principal (first use of this token), data version, page
+    assert 'desc="3 queries"' in timing
+    assert "over budget: GET /tasks" in caplog.text
+    assert "1x SELECT users.data_version" in caplog.text
+    assert "$1" not in caplog.text
+
+    assert request_timing.normalize_sql(
+        "SELECT * FROM t WHERE id IN ($1, $2, $3) AND name = 'x'  AND n > 10"
+    ) == "SELECT * FROM t WHERE id IN (...) AND name = ? AND n > ?"
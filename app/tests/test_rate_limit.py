@@ -0,0 +1,62 @@
+import pytest
+
+from app.core.rate_limit import (
+    RateLimit, MemoryRateLimitBackend, SQLiteRateLimitBackend, PostgresRateLimitBackend, limiter,
+)
+
+def test_rate_limit_spec():
+    assert RateLimit.parse("5/minute") == RateLimit(5, 60)
+    assert RateLimit.parse("10/30 seconds") == RateLimit(10, 30)
+    with pytest.raises(ValueError):
+        RateLimit.parse("lots")
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("kind", ["memory", "sqlite", "postgres"])
+async def test_rate_limit_backends(kind, tmp_path, engine):
+    backend = {
+        "memory": lambda: MemoryRateLimitBackend(),
+        "sqlite": lambda: SQLiteRateLimitBackend(str(tmp_path / "rl.sqlite3")),
+        "postgres": lambda: PostgresRateLimitBackend(engine),
+    }[kind]()
+    rate = RateLimit(3, 60)
+
+    # burst up to the limit, then refuse with a retry hint of ~one interval
+    assert [(await backend.hit("k", rate, 1))[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = await backend.hit("k", rate, 1)
+    assert not allowed and 0 < retry_after <= 20
+
+    # costs draw several tokens at once; keys are independent
+    assert (await backend.hit("other", rate, 2))[0]
+    assert not (await backend.hit("other", rate, 2))[0]
+    assert (await backend.hit("other", rate, 1))[0]
+    assert not (await backend.hit("huge", rate, 4))[0]
+
+@pytest.mark.anyio
+async def test_rate_limit_per_user_and_cost(client):
+    from fastapi import Depends
+    from httpx import AsyncClient, ASGITransport
+    from app.api.deps import search_cost
+    from app.main import create_app
+
+    tokens = []
+    for email in ("rl1@r.com", "rl2@r.com"):
+        await client.post("/auth/register", json={"email": email, "password": "password123"})
+        r = await client.post("/auth/login", json={"email": email, "password": "password123"})
+        tokens.append({"Authorization": f"Bearer {r.json()['access_token']}"})
+
+    app = create_app()
+    async def limited():
+        return {"ok": True}
+    app.add_api_route("/limited", limited, dependencies=[Depends(limiter.limit("6/minute", scope="test", cost=search_cost))])
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        # a search costs 5 of the 6, a plain request 1
+        assert (await ac.get("/limited?q=x", headers=tokens[0])).status_code == 200
+        assert (await ac.get("/limited", headers=tokens[0])).status_code == 200
+        r = await ac.get("/limited", headers=tokens[0])
+        assert r.status_code == 429 and int(r.headers["retry-after"]) >= 1
+        # same address, different user: separate budget
+        assert (await ac.get("/limited?q=x", headers=tokens[1])).status_code == 200
+        # anonymous callers are keyed by address
+        assert (await ac.get("/limited?q=x")).status_code == 200
+        assert (await ac.get("/limited?q=x")).status_code == 429
@@ -1,4 +1,5 @@
 import pytest
+import uuid
 
 @pytest.mark.anyio
 async def test_task_filters_pagination(client):
@@ -34,3 +35,701 @@ async def test_task_filters_pagination(client):
     r = await client.get("/tasks?q=Task 1", headers=headers)
     assert r.status_code == 200
     assert r.json()["total"] == 1
+
+@pytest.mark.anyio
+async def test_task_cursor_pagination(client):
+    await client.post("/auth/register", json={"email": "c@c.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "c@c.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    for i in range(7):
+        await client.post("/tasks", json={
+            "title": f"Task {i}",
+            "priority": ["low", "med", "high"][i % 3],
+            "due_date": f"2030-01-0{i + 1}" if i % 2 else None,
+        }, headers=headers)
+
+    for sort in ["-created_at", "title", "-priority", "due_date", "-due_date"]:
+        r = await client.get(f"/tasks?sort={sort}&page_size=7", headers=headers)
+        expected = [t["id"] for t in r.json()["items"]]
+
+        seen, cursor = [], None
+        while True:
+            url = f"/tasks?sort={sort}&page_size=3" + (f"&cursor={cursor}" if cursor else "")
+            r = await client.get(url, headers=headers)
+            assert r.status_code == 200
+            data = r.json()
+            seen += [t["id"] for t in data["items"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        assert seen == expected
+
+    r = await client.get("/tasks?sort=title&cursor=garbage", headers=headers)
+    assert r.status_code == 400
+
+@pytest.mark.anyio
+async def test_task_full_text_search(client):
+    await client.post("/auth/register", json={"email": "s@s.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "s@s.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    await client.post("/tasks", json={"title": "Plan sprint review", "status": "todo"}, headers=headers)
+    await client.post("/tasks", json={"title": "Groceries", "description": "review the sprint plan budget", "status": "done"}, headers=headers)
+    await client.post("/tasks", json={"title": "Planning poker"}, headers=headers)
+
+    r = await client.get("/tasks?q=sprint review", headers=headers)
+    assert r.json()["total"] == 2
+
+    r = await client.get('/tasks?q="sprint review"', headers=headers)
+    assert [t["title"] for t in r.json()["items"]] == ["Plan sprint review"]
+
+    r = await client.get("/tasks?q=plan*", headers=headers)
+    assert r.json()["total"] == 3
+
+    r = await client.get("/tasks?q=plan*&status=todo", headers=headers)
+    assert r.json()["total"] == 2
+
+    # title matches are weighted above description matches
+    r = await client.get("/tasks?q=sprint&sort=relevance", headers=headers)
+    assert [t["title"] for t in r.json()["items"]] == ["Plan sprint review", "Groceries"]
+
+    # a search with no usable words matches nothing rather than everything
+    for q in ("!!!", '"" * -', ", ;"):
+        r = await client.get("/tasks", params={"q": q, "sort": "relevance"}, headers=headers)
+        assert r.status_code == 200 and r.json()["total"] == 0 and r.json()["items"] == []
+
+@pytest.mark.anyio
+async def test_task_batch(client):
+    await client.post("/auth/register", json={"email": "b@b.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "b@b.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    r = await client.post("/tasks", json={"title": "Existing"}, headers=headers)
+    existing = r.json()["id"]
+    r = await client.post("/tasks", json={"title": "Doomed"}, headers=headers)
+    doomed = r.json()["id"]
+    missing = "00000000-0000-0000-0000-000000000000"
+
+    ops = [
+        {"op": "create", "data": {"title": "New 1", "priority": "high"}},
+        {"op": "create", "data": {"title": ""}},
+        {"op": "update", "id": existing, "data": {"status": "done"}},
+        {"op": "delete", "id": missing},
+        {"op": "delete", "id": doomed},
+    ]
+
+    # atomic: one bad item aborts everything
+    r = await client.post("/tasks/batch", json={"ops": ops}, headers=headers)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["committed"] is False
+    assert [x["status"] for x in data["results"]] == [424, 422, 424, 404, 424]
+    assert (await client.get("/tasks", headers=headers)).json()["total"] == 2
+
+    r = await client.post("/tasks/batch", json={"ops": ops, "atomic": False}, headers=headers)
+    data = r.json()
+    assert data["committed"] is True
+    assert [x["status"] for x in data["results"]] == [200, 422, 200, 404, 200]
+    assert data["results"][0]["item"]["priority"] == "high"
+    assert data["results"][2]["item"]["status"] == "done"
+
+    r = await client.get("/tasks?sort=title", headers=headers)
+    assert [t["title"] for t in r.json()["items"]] == ["Existing", "New 1"]
+
+    # nothing applied: the version and the list ETag stay put
+    etag = r.headers["etag"]
+    ops = [{"op": "delete", "id": str(uuid.uuid4())}, {"op": "update", "id": str(uuid.uuid4()), "data": {}}]
+    r = await client.post("/tasks/batch", json={"ops": ops, "atomic": False}, headers=headers)
+    assert r.json()["committed"] is False and [x["status"] for x in r.json()["results"]] == [404, 404]
+    r = await client.get("/tasks?sort=title", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+
+@pytest.mark.anyio
+async def test_task_export(client):
+    import csv
+    import io
+    import json
+
+    await client.post("/auth/register", json={"email": "e@e.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "e@e.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    for i in range(3):
+        await client.post("/tasks", json={"title": f"Export {i}", "description": "a, \"quoted\"\nline", "status": "done" if i else "todo"}, headers=headers)
+
+    r = await client.get("/tasks/export?status=done", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [t["title"] for t in rows] == ["Export 1", "Export 2"]
+    listed = (await client.get("/tasks?status=done&sort=created_at", headers=headers)).json()["items"]
+    assert rows == listed
+
+    r = await client.get("/tasks/export?format=csv", headers=headers)
+    assert r.status_code == 200
+    parsed = list(csv.DictReader(io.StringIO(r.text)))
+    assert [t["title"] for t in parsed] == ["Export 0", "Export 1", "Export 2"]
+    assert parsed[0]["description"] == "a, \"quoted\"\nline"
+
+@pytest.mark.anyio
+async def test_task_import(client):
+    await client.post("/auth/register", json={"email": "i@i.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "i@i.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    await client.post("/categories", json={"name": "Work"}, headers=headers)
+
+    body = (
+        "title,description,status,priority,due_date,category\n"
+        "Write report,\"multi\nline, with comma\",doing,high,2030-01-02,Work\n"
+        ",missing title,todo,low,,\n"
+        "Buy milk,,,,,Home\n"
+        "Bad status,,nope,,,\n"
+    )
+    r = await client.post("/tasks/import?format=csv", content=body, headers=headers)
+    assert r.status_code == 200
+    summary = r.json()
+    assert summary["rows"] == 4 and summary["imported"] == 2 and summary["failed"] == 2
+    assert [e["line"] for e in summary["errors"]] == [4, 6]
+
+    r = await client.get("/tasks?sort=title", headers=headers)
+    items = r.json()["items"]
+    assert [t["title"] for t in items] == ["Buy milk", "Write report"]
+    assert items[1]["description"] == "multi\nline, with comma"
+    assert items[1]["status"] == "doing" and items[1]["due_date"] == "2030-01-02"
+
+    r = await client.get("/categories", headers=headers)
+    assert sorted(c["name"] for c in r.json()["items"]) == ["Home", "Work"]
+
+    body = '{"title": "From json", "priority": "low"}\nnot json\n'
+    r = await client.post("/tasks/import?format=ndjson", content=body, headers=headers)
+    assert r.json()["imported"] == 1 and r.json()["errors"][0]["line"] == 2
+
+    # a BOM before the header is ignored; undecodable lines are row errors
+    body = b"\xef\xbb\xbftitle,priority\nBOM ok,low\nbad \xff byte,low\n"
+    r = await client.post("/tasks/import?format=csv", content=body, headers=headers)
+    assert r.json()["imported"] == 1 and r.json()["errors"] == [{"line": 3, "error": "Invalid UTF-8"}]
+    body = b'{"title": "caf\xe9"}\n{"title": "Fine"}\n'
+    r = await client.post("/tasks/import?format=ndjson", content=body, headers=headers)
+    assert r.json()["imported"] == 1 and r.json()["errors"] == [{"line": 1, "error": "Invalid UTF-8"}]
+
+@pytest.mark.anyio
+async def test_task_total_estimate(client):
+    await client.post("/auth/register", json={"email": "x@x.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "x@x.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    await client.post("/tasks", json={"title": "Estimate me"}, headers=headers)
+
+    r = await client.get("/tasks?total=estimate&q=estimate&status=todo&created_from=2020-01-01", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["total_mode"] == "estimate" and isinstance(r.json()["total"], int)
+
+@pytest.mark.anyio
+async def test_task_write_paths(client, engine):
+    from sqlalchemy import event
+
+    await client.post("/auth/register", json={"email": "w@w.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "w@w.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    missing = "00000000-0000-0000-0000-000000000000"
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    r = await client.post("/tasks", json={"title": "Write"}, headers=headers)
+    task = r.json()
+    assert task["status"] == "todo"
+
+    r = await client.patch(f"/tasks/{task['id']}", json={"status": "done"}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["status"] == "done" and r.json()["updated_at"] > task["updated_at"]
+    r = await client.post("/tasks/batch", json={"ops": [{"op": "create", "data": {"title": "Batched"}}]}, headers=headers)
+    assert r.status_code == 200
+    event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    # the write RETURNING clauses leave the deferred tsvector out
+    assert all("search_vector" not in s for s in statements if "RETURNING" in s)
+
+    r = await client.patch(f"/tasks/{task['id']}", json={}, headers=headers)
+    assert r.json()["status"] == "done"
+
+    assert (await client.patch(f"/tasks/{missing}", json={"title": "x"}, headers=headers)).status_code == 404
+    assert (await client.delete(f"/tasks/{missing}", headers=headers)).status_code == 404
+    assert (await client.delete(f"/tasks/{task['id']}", headers=headers)).status_code == 200
+    assert (await client.get(f"/tasks/{task['id']}", headers=headers)).status_code == 404
+
+@pytest.mark.anyio
+async def test_task_etags(client):
+    await client.post("/auth/register", json={"email": "etag@e.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "etag@e.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    r = await client.post("/tasks", json={"title": "Cache me"}, headers=headers)
+    task_id, etag = r.json()["id"], r.headers["etag"]
+
+    r = await client.get(f"/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304 and r.headers["etag"] == etag
+
+    r = await client.get("/tasks", headers=headers)
+    list_etag = r.headers["etag"]
+    r = await client.get("/tasks", headers={**headers, "If-None-Match": list_etag})
+    assert r.status_code == 304
+    r = await client.get("/tasks?status=todo", headers={**headers, "If-None-Match": list_etag})
+    assert r.status_code == 200
+
+    r = await client.patch(f"/tasks/{task_id}", json={"status": "doing"}, headers={**headers, "If-Match": etag})
+    assert r.status_code == 200
+    new_etag = r.headers["etag"]
+    assert new_etag != etag
+
+    # stale writers are rejected without clobbering the newer state
+    r = await client.patch(f"/tasks/{task_id}", json={"status": "done"}, headers={**headers, "If-Match": etag})
+    assert r.status_code == 412
+    r = await client.delete(f"/tasks/{task_id}", headers={**headers, "If-Match": etag})
+    assert r.status_code == 412
+
+    r = await client.get("/tasks", headers={**headers, "If-None-Match": list_etag})
+    assert r.status_code == 200 and r.json()["items"][0]["status"] == "doing"
+
+    r = await client.delete(f"/tasks/{task_id}", headers={**headers, "If-Match": new_etag})
+    assert r.status_code == 200
+
+@pytest.mark.anyio
+async def test_task_result_cache(client):
+    import asyncio
+    from app.core.cache import result_cache
+
+    await client.post("/auth/register", json={"email": "rc@r.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "rc@r.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    await client.post("/tasks", json={"title": "One"}, headers=headers)
+    r1 = await client.get("/tasks?status=todo&page_size=10", headers=headers)
+    hits = result_cache.hits
+    # same filters in a different order hit the same entry
+    r2 = await client.get("/tasks?page_size=10&status=todo", headers=headers)
+    assert result_cache.hits == hits + 1
+    assert r1.json() == r2.json()
+
+    # any write moves the user's generation on
+    await client.post("/tasks", json={"title": "Two"}, headers=headers)
+    r = await client.get("/tasks?status=todo&page_size=10", headers=headers)
+    assert r.json()["total"] == 2
+
+    # a write through another worker leaves this worker's generation alone,
+    # but its data_version bump still misses the entry, keeping body and ETag in step
+    etag = r.headers["etag"]
+    task_id = r.json()["items"][0]["id"]
+    assert (await client.get(f"/tasks/{task_id}", headers=headers)).json()["title"] in ("One", "Two")
+    invalidate = result_cache.invalidate
+    result_cache.invalidate = lambda user_id: asyncio.sleep(0)
+    try:
+        await client.post("/tasks", json={"title": "Three"}, headers=headers)
+        await client.patch(f"/tasks/{task_id}", json={"title": "Renamed"}, headers=headers)
+    finally:
+        result_cache.invalidate = invalidate
+    r = await client.get("/tasks?status=todo&page_size=10", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["total"] == 3 and r.headers["etag"] != etag
+    # single gets too
+    assert (await client.get(f"/tasks/{task_id}", headers=headers)).json()["title"] == "Renamed"
+
+    # concurrent identical misses share one load
+    calls = 0
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    user_id = r.json()["items"][0]["user_id"]
+    results = await asyncio.gather(*[
+        result_cache.get_or_load(user_id, "test", {"a": 1}, load) for _ in range(5)
+    ])
+    assert calls == 1 and all(res == {"ok": True} for res in results)
+
+@pytest.mark.anyio
+async def test_task_list_plans(client, session_maker):
+    import json
+    from datetime import date
+    from sqlalchemy import select, text
+    from app.core.auth_cache import Principal
+    from app.core.pagination import Explain, keyset_order
+    from app.models.task import Task, TaskStatus
+    from app.services.task_service import _task_filters
+
+    await client.post("/auth/register", json={"email": "plan@p.com", "password": "password123"})
+    async with session_maker() as db:
+        user_id = (await db.execute(text("SELECT id FROM users WHERE email = 'plan@p.com'"))).scalar_one()
+        # enough skewed rows for the planner to prefer the narrower indexes
+        await db.execute(text("""
+            INSERT INTO tasks (id, user_id, title, status, priority, due_date, created_at, updated_at)
+            SELECT gen_random_uuid(), :uid, 'task ' || i,
+                   (CASE WHEN i % 20 = 0 THEN 'todo' ELSE 'done' END)::task_status, 'med',
+                   date '2026-01-01' + (i % 90), now() - i * interval '1 hour', now()
+            FROM generate_series(1, 5000) AS i
+        """), {"uid": user_id})
+        await db.commit()
+        await db.execute(text("ANALYZE tasks"))
+    user = Principal(id=user_id)
+
+    async def plan(conds, order_col):
+        stmt = select(Task).where(*conds).order_by(*keyset_order(order_col, Task.id, False)).limit(20)
+        async with session_maker() as db:
+            # tiny test tables would always seq scan; ask what the index path is
+            await db.execute(text("SET enable_seqscan = off"))
+            return json.dumps((await db.execute(Explain(stmt))).scalar_one())
+
+    conds, _ = _task_filters(user, None, None, None, None, None, None, date(2026, 1, 1), date(2026, 1, 31))
+    p = await plan(conds, Task.created_at)
+    assert "ix_tasks_user_created_at_id" in p
+    assert "date(" not in p
+
+    conds, _ = _task_filters(user, None, TaskStatus.todo, None, None, None, date(2026, 1, 31), None, None)
+    p = await plan(conds, Task.due_date)
+    assert "ix_tasks_user_status_due_date_id" in p
+    assert '"Sort"' not in p
+
+@pytest.mark.anyio
+async def test_list_serialization_matches_pydantic(client, session_maker):
+    from datetime import date, datetime, timezone
+    from sqlalchemy import select, update
+    from app.models.category import Category
+    from app.models.task import Task
+    from app.schemas.category import CategoryOut, PageOut as CategoryPageOut
+    from app.schemas.task import TaskOut, PageOut
+
+    await client.post("/auth/register", json={"email": "js@j.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "js@j.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    cat_id = (await client.post("/categories", json={"name": "Café ☕"}, headers=headers)).json()["id"]
+    await client.post("/tasks", json={"title": 'Quote " and \\ slash'}, headers=headers)
+    await client.post("/tasks", json={
+        "title": "Ünïcödé 🚀", "description": "line\nbreak\ttab", "category_id": cat_id,
+        "status": "doing", "priority": "high", "due_date": "2030-01-31",
+    }, headers=headers)
+    async with session_maker() as db:
+        # whole seconds: both encoders must drop the fraction
+        await db.execute(update(Task).where(Task.title.startswith("Quote")).values(
+            created_at=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        ))
+        await db.commit()
+
+    async def expected_tasks(page_size, **page):
+        async with session_maker() as db:
+            tasks = (await db.execute(
+                select(Task).order_by(Task.created_at.desc(), Task.id.desc()).limit(page_size)
+            )).scalars().all()
+        return PageOut(
+            items=[TaskOut.model_validate(t) for t in tasks], page=1, page_size=page_size, **page
+        ).model_dump_json().encode()
+
+    r = await client.get("/tasks?page_size=5", headers=headers)
+    assert r.headers["content-type"] == "application/json" and r.headers["etag"]
+    assert r.content == await expected_tasks(5, total=2, total_mode="exact")
+
+    r = await client.get("/tasks?page_size=1&total=none", headers=headers)
+    body = await expected_tasks(1, total=None, total_mode="none", has_more=True, next_cursor=r.json()["next_cursor"])
+    assert r.content == body
+
+    async with session_maker() as db:
+        cats = (await db.execute(select(Category))).scalars().all()
+        tasks = (await db.execute(select(Task))).scalars().all()
+    r = await client.get("/categories", headers=headers)
+    assert r.content == CategoryPageOut(
+        items=[CategoryOut.model_validate(c) for c in cats], page=1, page_size=20, total=1,
+    ).model_dump_json().encode()
+    r = await client.get(f"/categories/{cat_id}", headers=headers)
+    assert r.content == CategoryOut.model_validate(cats[0]).model_dump_json().encode()
+    for t in tasks:
+        r = await client.get(f"/tasks/{t.id}", headers=headers)
+        assert r.content == TaskOut.model_validate(t).model_dump_json().encode()
+
+@pytest.mark.anyio
+async def test_sparse_fieldsets(client):
+    await client.post("/auth/register", json={"email": "sf@s.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "sf@s.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    cat_id = (await client.post("/categories", json={"name": "Work"}, headers=headers)).json()["id"]
+    for i in range(5):
+        await client.post("/tasks", json={"title": f"T{i}", "description": "x" * 1000, "due_date": f"2030-01-0{i + 1}"}, headers=headers)
+
+    # order follows the schema, not the parameter; the sort key isn't echoed
+    r = await client.get("/tasks?fields=due_date, status,title&sort=-due_date&page_size=2&total=none", headers=headers)
+    assert r.status_code == 200
+    items = r.json()["items"]
+    assert [list(t) for t in items] == [["title", "status", "due_date"]] * 2
+    assert [t["title"] for t in items] == ["T4", "T3"]
+    r = await client.get(f"/tasks?fields=title&sort=-due_date&page_size=2&total=none&cursor={r.json()['next_cursor']}", headers=headers)
+    assert r.json()["items"] == [{"title": "T2"}, {"title": "T1"}]
+
+    full = await client.get("/tasks?page_size=1", headers=headers)
+    slim = await client.get("/tasks?page_size=1&fields=id", headers=headers)
+    assert list(full.json()["items"][0]) != ["id"] and list(slim.json()["items"][0]) == ["id"]
+    assert full.headers["etag"] != slim.headers["etag"]
+
+    task_id = full.json()["items"][0]["id"]
+    r = await client.get(f"/tasks/{task_id}?fields=title,updated_at", headers=headers)
+    assert list(r.json()) == ["title", "updated_at"]
+    # same resource version, same validator, whatever the projection
+    r2 = await client.get(f"/tasks/{task_id}?fields=status", headers=headers)
+    assert r2.json() == {"status": "todo"} and r2.headers["etag"] == r.headers["etag"]
+    r = await client.patch(f"/tasks/{task_id}", json={"status": "done"}, headers={**headers, "If-Match": r.headers["etag"]})
+    assert r.status_code == 200
+    r = await client.get(f"/tasks/{task_id}?fields=status", headers=headers)
+    assert r.json() == {"status": "done"}
+
+    r = await client.get(f"/categories/{cat_id}?fields=name", headers=headers)
+    assert r.json() == {"name": "Work"} and r.headers["etag"]
+    r = await client.get("/categories?fields=id,name", headers=headers)
+    assert r.json()["items"] == [{"id": cat_id, "name": "Work"}]
+
+    for url in ("/tasks?fields=title,search_vector", f"/tasks/{task_id}?fields=", "/categories?fields=user_id"):
+        r = await client.get(url, headers=headers)
+        assert r.status_code == 400
+
+@pytest.mark.anyio
+async def test_task_stats_counters(client, session_maker):
+    from app.core.cache import result_cache
+    from app.services.task_counter_service import rebuild_task_counters
+
+    await client.post("/auth/register", json={"email": "ts@s.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "ts@s.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    async def stats(**params):
+        r = await client.get("/tasks/stats", params={"today": "2030-01-09", **params}, headers=headers)
+        assert r.status_code == 200
+        return r.json()
+
+    async def assert_matches_rebuild():
+        # counters maintained by the write paths == a full recount
+        before = await stats()
+        async with session_maker() as db:
+            await rebuild_task_counters(db)
+        await result_cache.clear()
+        assert await stats() == before
+        return before
+
+    work = (await client.post("/categories", json={"name": "Work"}, headers=headers)).json()["id"]
+    home = (await client.post("/categories", json={"name": "Home"}, headers=headers)).json()["id"]
+
+    # 2030-01-09 is a Wednesday: the week runs to Sunday the 13th
+    t1 = (await client.post("/tasks", json={"title": "a", "category_id": work, "due_date": "2030-01-01"}, headers=headers)).json()
+    t2 = (await client.post("/tasks", json={"title": "b", "category_id": work, "due_date": "2030-01-09", "priority": "high"}, headers=headers)).json()
+    await client.post("/tasks", json={"title": "c", "due_date": "2030-01-13", "status": "doing"}, headers=headers)
+    await client.post("/tasks", json={"title": "d", "due_date": "2030-01-14"}, headers=headers)
+    await client.post("/tasks", json={"title": "e", "due_date": "2030-01-02", "status": "done"}, headers=headers)
+
+    s = await assert_matches_rebuild()
+    assert s["total"] == 5
+    assert s["by_status"] == {"todo": 3, "doing": 1, "done": 1}
+    assert s["by_priority"] == {"low": 0, "med": 4, "high": 1}
+    assert s["by_category"] == [
+        {"category_id": None, "total": 3, "by_status": {"todo": 1, "doing": 1, "done": 1}},
+        {"category_id": work, "total": 2, "by_status": {"todo": 2, "doing": 0, "done": 0}},
+    ]
+    assert s["overdue"] == 1 and s["due_this_week"] == 2
+
+    # update (moving category and status), no-op update, delete
+    await client.patch(f"/tasks/{t1['id']}", json={"category_id": home, "status": "done"}, headers=headers)
+    await client.patch(f"/tasks/{t2['id']}", json={"title": "renamed"}, headers=headers)
+    await client.delete(f"/tasks/{t2['id']}", headers=headers)
+    s = await assert_matches_rebuild()
+    assert s["total"] == 4 and s["overdue"] == 0 and s["due_this_week"] == 1
+
+    # batch and import
+    r = await client.post("/tasks/batch", json={"ops": [
+        {"op": "create", "data": {"title": "f", "category_id": work, "priority": "low"}},
+        {"op": "update", "id": t1["id"], "data": {"priority": "high", "category_id": None}},
+    ]}, headers=headers)
+    assert r.json()["committed"]
+    csv_body = "title,category,status\ng,Home,doing\nh,New,todo\n"
+    r = await client.post("/tasks/import?format=csv", content=csv_body.encode(), headers=headers)
+    assert r.json()["imported"] == 2
+    s = await assert_matches_rebuild()
+    assert s["total"] == 7 and s["by_status"]["doing"] == 2
+
+    # deleting a category makes its tasks uncategorized
+    await client.delete(f"/categories/{work}", headers=headers)
+    s = await assert_matches_rebuild()
+    assert work not in [g["category_id"] for g in s["by_category"]]
+    assert next(g for g in s["by_category"] if g["category_id"] is None)["total"] == 5
+
+    r = await client.get("/tasks/stats?today=2030-01-09", headers=headers)
+    r = await client.get("/tasks/stats?today=2030-01-09", headers={**headers, "If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+
+@pytest.mark.anyio
+async def test_task_changes_feed(client, session_maker):
+    from app.services.change_feed_service import purge_tombstones
+
+    await client.post("/auth/register", json={"email": "feed@t.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "feed@t.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    async def sync(since=None, limit=2):
+        # follows next_since until caught up, as a client would
+        changes, pages = [], 0
+        while True:
+            params = {"limit": limit, **({"since": since} if since else {})}
+            r = await client.get("/tasks/changes", params=params, headers=headers)
+            assert r.status_code == 200
+            body = r.json()
+            changes += body["changes"]
+            since, pages = body["next_since"], pages + 1
+            if not body["has_more"]:
+                return changes, since, pages
+
+    work = (await client.post("/categories", json={"name": "Work"}, headers=headers)).json()
+    a = (await client.post("/tasks", json={"title": "a", "category_id": work["id"]}, headers=headers)).json()
+    b = (await client.post("/tasks", json={"title": "b"}, headers=headers)).json()
+    r = await client.post("/tasks/batch", json={"ops": [{"op": "create", "data": {"title": t}} for t in "cde"]}, headers=headers)
+    batch_ids = [res["id"] for res in r.json()["results"]]
+
+    changes, since, pages = await sync()
+    assert pages == 3
+    assert [(c["kind"], c["id"]) for c in changes[:3]] == [("category", work["id"]), ("task", a["id"]), ("task", b["id"])]
+    assert {c["id"] for c in changes[3:]} == set(batch_ids)
+    # the batch is one write: one seq, split across pages by the cursor
+    assert len({c["seq"] for c in changes[3:]}) == 1
+    assert changes[1]["data"] == (await client.get(f"/tasks/{a['id']}", headers=headers)).json()
+
+    # polling with nothing new
+    assert await sync(since) == ([], since, 1)
+
+    await client.patch(f"/tasks/{b['id']}", json={"status": "done"}, headers=headers)
+    await client.delete(f"/tasks/{batch_ids[0]}", headers=headers)
+    await client.delete(f"/categories/{work['id']}", headers=headers)
+    changes, since, _ = await sync(since, limit=100)
+    summary = [(c["kind"], c["id"], c["deleted"]) for c in changes]
+    assert summary == [
+        ("task", b["id"], False),
+        ("task", batch_ids[0], True),
+        # the category and its moved-out task share the delete's seq
+        ("category", work["id"], True),
+        ("task", a["id"], False),
+    ]
+    assert changes[1]["data"] is None and changes[3]["data"]["category_id"] is None
+    assert changes[2]["seq"] == changes[3]["seq"]
+
+    # a full sync skips deletes from before it started
+    changes, _, _ = await sync()
+    assert {c["id"] for c in changes} == {a["id"], b["id"], *batch_ids[1:]}
+    assert not any(c["deleted"] for c in changes)
+
+    # purged deletes invalidate older cursors
+    old_since = str(int(since) - 1)
+    async with session_maker() as db:
+        assert (await purge_tombstones(db, retention_days=0)) == {"tombstones": 2, "users": 1}
+    r = await client.get("/tasks/changes", params={"since": old_since}, headers=headers)
+    assert r.status_code == 410
+    assert (await client.get("/tasks/changes", params={"since": since}, headers=headers)).status_code == 200
+    assert (await client.get("/tasks/changes", params={"since": "x.y"}, headers=headers)).status_code == 400
+
+@pytest.mark.anyio
+async def test_task_changes_consistent_batches(client, session_maker):
+    from app.core.auth_cache import Principal
+    from app.services.change_feed_service import list_changes
+
+    await client.post("/auth/register", json={"email": "feed2@t.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "feed2@t.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    work = (await client.post("/categories", json={"name": "Work"}, headers=headers)).json()
+    task = (await client.post("/tasks", json={"title": "a", "category_id": work["id"]}, headers=headers)).json()
+    user = Principal(id=uuid.UUID(task["user_id"]))
+
+    async with session_maker() as db:
+        execute = db.execute
+        calls = 0
+
+        # the category delete commits between the task scan and the tombstone scan
+        async def racing_execute(*args, **kw):
+            nonlocal calls
+            calls += 1
+            if calls == 4:
+                assert (await client.delete(f"/categories/{work['id']}", headers=headers)).status_code == 200
+            return await execute(*args, **kw)
+
+        db.execute = racing_execute
+        page = await list_changes(db, user, "1", 100)
+    assert [(c["kind"], c["deleted"]) for c in page["changes"]] == [("task", False)]
+    assert page["next_since"] == "2"
+
+    # the delete arrives whole in the next batch: tombstone and moved task
+    r = await client.get("/tasks/changes", params={"since": page["next_since"]}, headers=headers)
+    changes = r.json()["changes"]
+    assert [(c["kind"], c["id"], c["deleted"]) for c in changes] == [
+        ("category", work["id"], True), ("task", task["id"], False),
+    ]
+    assert changes[1]["data"]["category_id"] is None
+
+@pytest.mark.anyio
+async def test_task_event_stream(client, monkeypatch):
+    import asyncio
+    import json
+    from app.core import events
+
+    await client.post("/auth/register", json={"email": "live@t.com", "password": "password123"})
+    r = await client.post("/auth/login", json={"email": "live@t.com", "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    monkeypatch.setattr(events.broker, "max_queue", 2)
+
+    # driven through ASGI directly: httpx's ASGITransport buffers whole responses
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/tasks/stream", "raw_path": b"/tasks/stream", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"test"), (b"authorization", headers["Authorization"].encode())],
+        "client": ("127.0.0.1", 5000), "server": ("test", 80),
+    }
+    disconnected = asyncio.Event()
+    # bounded like a socket buffer, so an unread stream backs up into the broker
+    chunks: asyncio.Queue = asyncio.Queue(1)
+    started = {}
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            started.update(message)
+        elif message.get("body"):
+            await chunks.put(message["body"])
+
+    async def next_event():
+        while True:
+            chunk = (await asyncio.wait_for(chunks.get(), 5)).decode()
+            fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n") if ": " in line and not line.startswith(":"))
+            if "event" in fields:
+                return fields["event"], json.loads(fields["data"])["seq"]
+
+    stream = asyncio.create_task(client._transport.app(scope, receive, send))
+    try:
+        assert await next_event() == ("ready", 0)
+        assert started["status"] == 200
+        assert events.broker.stats()["subscribers"] == 1
+
+        await client.post("/tasks", json={"title": "a"}, headers=headers)
+        assert await next_event() == ("change", 1)
+        await client.post("/categories", json={"name": "Work"}, headers=headers)
+        assert await next_event() == ("change", 2)
+        # a rolled back write publishes nothing
+        assert (await client.post("/categories", json={"name": "Work"}, headers=headers)).status_code == 409
+        await client.post("/tasks", json={"title": "b"}, headers=headers)
+        assert await next_event() == ("change", 3)
+
+        # a consumer that stops reading is cut over to one "lagged" event
+        for n in range(6):
+            await client.post("/tasks", json={"title": f"t{n}"}, headers=headers)
+        received = []
+        while not received or received[-1][0] != "lagged":
+            received.append(await next_event())
+        assert len(received) < 6
+        await client.post("/tasks", json={"title": "after"}, headers=headers)
+        assert await next_event() == ("change", 10)
+    finally:
+        disconnected.set()
+        await asyncio.wait_for(stream, 5)
+        assert events.broker.stats()["subscribers"] == 0
+        await events.broker.stop()
@@ -0,0 +1,176 @@
+# Synthetic dataset for the load benchmark, written with COPY against a
+# migrated database:
+#
+#   DATABASE_URL=... python -m benchmarks.dataset --users 200 --tasks 2000000
+#
+# Users are <prefix>-<n>@bench.example.com, all with PASSWORD. Tasks per user
+# follow a long-tailed (Pareto) distribution, so a few users carry most rows
+# as in real tenants. Re-running with the same --prefix replaces the data.
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.security import hash_password
+from app.models.task import Task
+from app.models.task_counter import task_counters
+from app.models.user import User
+from app.services.import_service import COPY_COLUMNS
+
+PASSWORD = "benchmark-password"
+CHUNK_ROWS = 50_000
+
+# titles and descriptions draw from this, so full-text queries in the load
+# driver match a realistic share of rows
+WORDS = (
+    "report invoice review deploy meeting budget client release backlog design "
+    "refactor migrate schedule audit onboarding renew contract roadmap hiring "
+    "follow-up draft plan update fix test docs call email sync research launch"
+).split()
+CATEGORY_NAMES = ["Work", "Personal", "Errands", "Finance", "Health", "Home", "Learning", "Travel", "Side project", "Admin"]
+
+STATUSES = (("todo", 45), ("doing", 20), ("done", 35))
+PRIORITIES = (("low", 30), ("med", 50), ("high", 20))
+
+
+def user_email(prefix: str, n: int) -> str:
+    return f"{prefix}-{n}@bench.example.com"
+
+
+def _choice(rng: random.Random, weighted) -> str:
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def tasks_per_user(rng: random.Random, users: int, total: int) -> list[int]:
+    weights = [rng.paretovariate(1.2) for _ in range(users)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in range(total - sum(counts)):
+        counts[i % users] += 1
+    return counts
+
+
+def task_records(rng: random.Random, user_id: uuid.UUID, categories: list[uuid.UUID], count: int, now: datetime):
+    today = now.date()
+    for _ in range(count):
+        # most activity is recent; a year of history in the tail
+        created = now - timedelta(seconds=min(rng.expovariate(1 / (45 * 86400)), 365 * 86400))
+        updated = min(created + timedelta(seconds=rng.expovariate(1 / (3 * 86400))), now)
+        due: date | None = None
+        if rng.random() < 0.7:
+            due = today + timedelta(days=rng.randint(-45, 120))
+        description = None
+        if rng.random() < 0.6:
+            # mostly a sentence or two, occasionally a long note
+            description = _words(rng, max(1, min(int(rng.lognormvariate(2.8, 0.9)), 600)))
+        yield (
+            uuid.uuid4(), user_id,
+            rng.choice(categories) if categories and rng.random() < 0.7 else None,
+            _words(rng, rng.randint(2, 7)).capitalize()[:140], description,
+            # change_seq: the seeding counts as each user's first write (data_version 1)
+            _choice(rng, STATUSES), _choice(rng, PRIORITIES), due, created, updated, 1,
+        )
+
+
+def _chunks(records, size: int):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def seed(prefix: str, users: int, tasks: int, max_categories: int, seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    engine = create_async_engine(settings.database_url)
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    password_hash = hash_password(PASSWORD)
+
+    try:
+        async with engine.begin() as conn:
+            # cascades to categories, tasks and refresh tokens of a previous run
+            await conn.execute(delete(User).where(User.email.like(f"{prefix}-%@bench.example.com")))
+
+            user_rows = [(uuid.uuid4(), user_email(prefix, n), password_hash, now, 1) for n in range(users)]
+            category_rows = []
+            categories: dict[uuid.UUID, list[uuid.UUID]] = {}
+            for user_id, *_ in user_rows:
+                names = rng.sample(CATEGORY_NAMES, rng.randint(0, min(max_categories, len(CATEGORY_NAMES))))
+                rows = [(uuid.uuid4(), user_id, name, now, now) for name in names]
+                categories[user_id] = [r[0] for r in rows]
+                category_rows += rows
+
+            raw = (await conn.get_raw_connection()).driver_connection
+            await raw.copy_records_to_table(
+                "users", records=user_rows, columns=["id", "email", "password_hash", "created_at", "data_version"]
+            )
+            await raw.copy_records_to_table(
+                "categories", records=category_rows, columns=["id", "user_id", "name", "created_at", "updated_at"]
+            )
+
+            def all_tasks():
+                for (user_id, *_), count in zip(user_rows, tasks_per_user(rng, users, tasks)):
+                    yield from task_records(rng, user_id, categories[user_id], count, now)
+
+            written = 0
+            for chunk in _chunks(all_tasks(), CHUNK_ROWS):
+                await raw.copy_records_to_table("tasks", records=chunk, columns=COPY_COLUMNS)
+                written += len(chunk)
+                print(f"[seed] tasks={written}/{tasks}", file=sys.stderr)
+
+            # what the write paths would have kept in task_counters
+            await conn.execute(
+                task_counters.insert().from_select(
+                    ["user_id", "category_id", "status", "priority", "count"],
+                    select(Task.user_id, Task.category_id, Task.status, Task.priority, func.count())
+                    .where(Task.user_id.in_([r[0] for r in user_rows]))
+                    .group_by(Task.user_id, Task.category_id, Task.status, Task.priority),
+                )
+            )
+
+        # fresh statistics, or the first benchmark minutes measure bad plans
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("ANALYZE users, categories, tasks, task_counters"))
+    finally:
+        await engine.dispose()
+
+    return {
+        "prefix": prefix,
+        "users": users,
+        "categories": len(category_rows),
+        "tasks": written,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.dataset")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=8, help="max categories per user")
+    parser.add_argument("--prefix", default="bench")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(seed(args.prefix, args.users, args.tasks, args.categories, args.seed)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
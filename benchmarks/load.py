@@ -0,0 +1,268 @@
+# Load driver for the API over a dataset from benchmarks.dataset. Runs the
+# app in-process through httpx.ASGITransport by default, or against a
+# running server with --url:
+#
+#   DATABASE_URL=... python -m benchmarks.load --users 50 --duration 60 --output run.json
+#   python -m benchmarks.load --url http://localhost:8000 --users 50 --duration 60
+#
+# Each virtual user logs in as one seeded user, then loops over a weighted mix
+# of list_tasks filter/sort variants, stats, CRUD and token refresh. The report has
+# p50/p95/p99 and req/s per operation and overall, as JSON for comparing runs.
+#
+# In-process runs bypass rate limiting. Against a server, run it with a large
+# RATE_LIMIT_API and RATE_LIMIT_TRUSTED_PROXY_HOPS=1: each virtual user sends
+# its own X-Forwarded-For, so the per-address login limit applies per user.
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.dataset import PASSWORD, WORDS, user_email
+
+# (operation, weight); reads dominate, as in the production mix
+MIX = (
+    ("list_recent", 25),
+    ("list_todo_by_due", 15),
+    ("list_high_priority", 8),
+    ("list_search", 8),
+    ("list_created_range", 5),
+    ("list_next_page", 7),
+    ("get", 12),
+    ("create", 8),
+    ("update", 7),
+    ("delete", 3),
+    ("stats", 3),
+    ("refresh", 2),
+)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.statuses: dict[int, int] = defaultdict(int)
+        self.recording = False
+
+    def add(self, op: str, seconds: float, status: int) -> None:
+        if not self.recording:
+            return
+        self.latencies[op].append(seconds)
+        self.statuses[status] += 1
+        if status >= 400:
+            self.errors[op] += 1
+
+
+def percentile(sorted_samples: list[float], p: float) -> float:
+    # nearest rank
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[max(math.ceil(p / 100 * len(sorted_samples)) - 1, 0)]
+
+
+def summarize(samples: list[float], errors: int, elapsed: float) -> dict:
+    samples = sorted(samples)
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1),
+        "mean_ms": ms(sum(samples) / len(samples)) if samples else 0.0,
+        "p50_ms": ms(percentile(samples, 50)),
+        "p95_ms": ms(percentile(samples, 95)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "max_ms": ms(samples[-1]) if samples else 0.0,
+    }
+
+
+class VirtualUser:
+    def __init__(self, n: int, client: httpx.AsyncClient, recorder: Recorder, prefix: str, seed: int):
+        self.n = n
+        self.client = client
+        self.recorder = recorder
+        self.email = user_email(prefix, n)
+        self.rng = random.Random(seed + n)
+        self.headers = {"X-Forwarded-For": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"}
+        self.refresh_token = None
+        self.known_ids: list[str] = []
+        self.created_ids: list[str] = []
+        self.next_page: dict | None = None
+
+    async def request(self, op: str, method: str, url: str, **kw) -> httpx.Response:
+        started = time.perf_counter()
+        res = await self.client.request(method, url, headers=self.headers, **kw)
+        self.recorder.add(op, time.perf_counter() - started, res.status_code)
+        return res
+
+    def _authenticate(self, tokens: dict) -> None:
+        self.headers["Authorization"] = f"Bearer {tokens['access_token']}"
+        self.refresh_token = tokens["refresh_token"]
+
+    async def login(self) -> None:
+        res = await self.request("login", "POST", "/auth/login", json={"email": self.email, "password": PASSWORD})
+        res.raise_for_status()
+        self._authenticate(res.json())
+
+    async def list(self, op: str, params: dict) -> None:
+        res = await self.request(op, "GET", "/tasks", params={"page_size": 20, **params})
+        if res.status_code == 200:
+            body = res.json()
+            ids = [t["id"] for t in body["items"]]
+            if ids:
+                self.known_ids = (self.known_ids + ids)[-500:]
+            # a cursor is only valid with the filters and sort it came from
+            cursor = body.get("next_cursor")
+            self.next_page = {**params, "cursor": cursor, "total": "none"} if cursor else None
+
+    async def step(self) -> None:
+        ops, weights = zip(*MIX)
+        op = self.rng.choices(ops, weights)[0]
+        today = date.today()
+
+        if op == "list_recent":
+            await self.list(op, {"sort": "-created_at", "total": "estimate"})
+        elif op == "list_todo_by_due":
+            await self.list(op, {"status": "todo", "sort": "due_date", "due_to": str(today + timedelta(days=14))})
+        elif op == "list_high_priority":
+            await self.list(op, {"priority": "high", "sort": "-updated_at"})
+        elif op == "list_search":
+            await self.list(op, {"q": self.rng.choice(WORDS), "total": "none"})
+        elif op == "list_created_range":
+            start = today - timedelta(days=self.rng.randint(7, 90))
+            await self.list(op, {"created_from": str(start), "created_to": str(start + timedelta(days=7))})
+        elif op == "list_next_page":
+            if self.next_page:
+                await self.list(op, self.next_page)
+            else:
+                await self.list("list_recent", {"sort": "-created_at", "total": "estimate"})
+        elif op == "get" and self.known_ids:
+            await self.request(op, "GET", f"/tasks/{self.rng.choice(self.known_ids)}")
+        elif op == "create":
+            res = await self.request(op, "POST", "/tasks", json={
+                "title": f"{self.rng.choice(WORDS)} {self.rng.choice(WORDS)}".capitalize(),
+                "priority": self.rng.choice(["low", "med", "high"]),
+                "due_date": str(today + timedelta(days=self.rng.randint(0, 30))),
+            })
+            if res.status_code == 200:
+                self.created_ids.append(res.json()["id"])
+        elif op == "update" and self.known_ids:
+            await self.request(op, "PATCH", f"/tasks/{self.rng.choice(self.known_ids)}", json={
+                "status": self.rng.choice(["todo", "doing", "done"]),
+            })
+        elif op == "delete" and self.created_ids:
+            # only tasks this run created, so the dataset stays the same size
+            task_id = self.created_ids.pop()
+            await self.request(op, "DELETE", f"/tasks/{task_id}")
+            if task_id in self.known_ids:
+                self.known_ids.remove(task_id)
+        elif op == "stats":
+            await self.request(op, "GET", "/tasks/stats")
+        elif op == "refresh":
+            res = await self.request(op, "POST", "/auth/refresh", json={"refresh_token": self.refresh_token})
+            if res.status_code == 200:
+                self._authenticate(res.json())
+        else:
+            # get/update/delete with nothing to act on yet
+            await self.list("list_recent", {"sort": "-created_at", "total": "estimate"})
+
+    async def run(self, stop_at: float) -> None:
+        while time.perf_counter() < stop_at:
+            await self.step()
+
+
+def _client(url: str | None, timeout: float) -> httpx.AsyncClient:
+    if url:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        return httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+
+    from app.core.rate_limit import RateLimitBackend, limiter
+    from app.main import create_app
+
+    class Unlimited(RateLimitBackend):
+        async def hit(self, key, rate, cost):
+            return True, 0.0
+
+    # the route dependencies hold the module-level limiter; swap its backend
+    limiter.backend = Unlimited()
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()), base_url="http://bench", timeout=timeout)
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    async with _client(args.url, args.timeout) as client:
+        vusers = [VirtualUser(n, client, recorder, args.prefix, args.seed) for n in range(args.users)]
+
+        # logins are measured (bcrypt dominates them) but happen up front
+        recorder.recording = True
+        sem = asyncio.Semaphore(args.login_concurrency)
+
+        async def login(vu: VirtualUser):
+            async with sem:
+                await vu.login()
+
+        login_started = time.perf_counter()
+        await asyncio.gather(*(login(vu) for vu in vusers))
+        login_elapsed = time.perf_counter() - login_started
+        login_samples = recorder.latencies.pop("login", [])
+        login_errors = recorder.errors.pop("login", 0)
+
+        if args.warmup > 0:
+            recorder.recording = False
+            stop_at = time.perf_counter() + args.warmup
+            await asyncio.gather(*(vu.run(stop_at) for vu in vusers))
+            recorder.recording = True
+
+        recorder.statuses.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(vu.run(started + args.duration) for vu in vusers))
+        elapsed = time.perf_counter() - started
+
+    all_samples = [s for samples in recorder.latencies.values() for s in samples]
+    return {
+        "config": {
+            "target": args.url or "in-process",
+            "users": args.users,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "elapsed_s": round(elapsed, 2),
+        "total": summarize(all_samples, sum(recorder.errors.values()), elapsed),
+        "statuses": {str(k): v for k, v in sorted(recorder.statuses.items())},
+        "operations": {
+            "login": summarize(login_samples, login_errors, login_elapsed),
+            **{op: summarize(recorder.latencies[op], recorder.errors[op], elapsed)
+               for op, _ in MIX if recorder.latencies[op]},
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load")
+    parser.add_argument("--url", help="base URL of a running server (default: in-process app)")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--prefix", default="bench", help="dataset prefix given to benchmarks.dataset")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Compares the single-statement write paths in task_service (RETURNING, with
+# the version bump, tombstone and counter deltas as CTEs) with the previous
+# select / commit / refresh pattern doing the same bookkeeping one statement
+# at a time, against a migrated database:
+#
+#   DATABASE_URL=... python -m benchmarks.write_roundtrips --iterations 500
+#
+# Reports latency percentiles and database round trips (statements plus
+# BEGIN/COMMIT) per operation as JSON.
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import event, delete, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.models.task import Task
+from app.models.tombstone import tombstones
+from app.models.user import User
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.services import task_service
+from app.services.change_service import next_seq
+from app.services.task_counter_service import apply_deltas, delta_key
+
+
+# the pre-RETURNING implementations, kept here only as the baseline
+async def legacy_create(db: AsyncSession, user: Principal, data: TaskCreate) -> Task:
+    task = Task(user_id=user.id, change_seq=await next_seq(db, user.id), **data.model_dump())
+    db.add(task)
+    await apply_deltas(db, user.id, Counter({delta_key(data.category_id, data.status, data.priority): 1}))
+    await db.commit()
+    await db.refresh(task)
+    return task
+
+async def legacy_update(db: AsyncSession, user: Principal, task_id: uuid.UUID, data: TaskUpdate) -> Task:
+    task = await task_service.get_task(db, user, task_id)
+    deltas = Counter({delta_key(task.category_id, task.status, task.priority): -1})
+    for field, value in data.model_dump(exclude_unset=True).items():
+        setattr(task, field, value)
+    deltas[delta_key(task.category_id, task.status, task.priority)] += 1
+    task.change_seq = await next_seq(db, user.id)
+    await apply_deltas(db, user.id, deltas)
+    await db.commit()
+    await db.refresh(task)
+    return task
+
+async def legacy_delete(db: AsyncSession, user: Principal, task_id: uuid.UUID) -> None:
+    task = await task_service.get_task(db, user, task_id)
+    seq = await next_seq(db, user.id)
+    await db.execute(insert(tombstones).values(
+        user_id=user.id, change_seq=seq, kind="task", record_id=task.id, deleted_at=datetime.now(timezone.utc),
+    ))
+    await apply_deltas(db, user.id, Counter({delta_key(task.category_id, task.status, task.priority): -1}))
+    await db.delete(task)
+    await db.commit()
+
+class RoundTrips:
+    def __init__(self, engine):
+        self.count = 0
+        for name in ("before_cursor_execute", "begin", "commit", "rollback"):
+            event.listen(engine.sync_engine, name, self._hit)
+
+    def _hit(self, *args, **kwargs):
+        self.count += 1
+
+
+def summarize(samples: list[float], trips: int) -> dict:
+    samples = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 3),
+        "round_trips_per_op": round(trips / len(samples), 2),
+    }
+
+
+async def run(iterations: int) -> dict:
+    engine = create_async_engine(settings.database_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    trips = RoundTrips(engine)
+
+    async with sessions() as db:
+        user = User(email=f"bench-{uuid.uuid4().hex}@example.com", password_hash="x")
+        db.add(user)
+        await db.commit()
+        principal = Principal(id=user.id)
+
+    impls = {
+        "legacy": (legacy_create, legacy_update, legacy_delete),
+        "returning": (task_service.create_task, task_service.update_task, task_service.delete_task),
+    }
+    report = {}
+    try:
+        for name, (create, update, remove) in impls.items():
+            timings = {"create": [], "update": [], "delete": []}
+            counts = {"create": 0, "update": 0, "delete": 0}
+            for i in range(iterations):
+                for op in ("create", "update", "delete"):
+                    async with sessions() as db:
+                        before = trips.count
+                        start = time.perf_counter()
+                        if op == "create":
+                            task = await create(db, principal, TaskCreate(title=f"bench {i}"))
+                        elif op == "update":
+                            await update(db, principal, task.id, TaskUpdate(status="done"))
+                        else:
+                            await remove(db, principal, task.id)
+                        timings[op].append(time.perf_counter() - start)
+                        counts[op] += trips.count - before
+            report[name] = {op: summarize(timings[op], counts[op]) for op in timings}
+    finally:
+        async with sessions() as db:
+            await db.execute(delete(User).where(User.id == principal.id))
+            await db.commit()
+        await engine.dispose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.write_roundtrips")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 #!/bin/sh
 set -e
 
-echo "[startup] Running migrations..."
-alembic upgrade head
-
+# WEB_CONCURRENCY workers; DB_MAX_CONNECTIONS (optional) is split across them.
+# Migrations run once here, before the workers start; set RUN_MIGRATIONS=0
+# when a separate release step runs `python -m app.cli migrate`.
 echo "[startup] Starting API..."
-exec uvicorn app.main:app --host 0.0.0.0 --port "${PORT:-8000}"
+exec python -m app.cli serve --host 0.0.0.0 --port "${PORT:-8000}"